@@ -6,13 +6,12 @@ Tres agentes especializados para asistir desarrollo, debugging y automatizacion:
 - SupabaseAgent: Operaciones de base de datos y diagnosticos
 - PipelineAgent: Testing y debugging del pipeline de procesamiento de PDFs
 - StreamlitAgent: Generacion de codigo y testing de UI
+
+Los agentes se importan bajo demanda (PEP 562): `import agents` no carga
+Supabase, pdfplumber ni nada pesado hasta que se accede al nombre.
 """
 
-from .base import BaseAgent
-from .config import AgentConfig
-from .supabase_agent import SupabaseAgent
-from .pipeline_agent import PipelineAgent
-from .streamlit_agent import StreamlitAgent
+import importlib
 
 __all__ = [
     "BaseAgent",
@@ -23,3 +22,24 @@ __all__ = [
 ]
 
 __version__ = "1.0.0"
+
+_LAZY = {
+    "BaseAgent": ".base",
+    "AgentConfig": ".config",
+    "SupabaseAgent": ".supabase_agent",
+    "PipelineAgent": ".pipeline_agent",
+    "StreamlitAgent": ".streamlit_agent",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
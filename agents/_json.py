@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Serialización JSON para los agentes.
+Usa orjson si está instalado; si no, cae a json de la stdlib con el mismo formato.
+
+Dataclasses (ParserResult, TableInfo, ...), enums, datetimes, UUIDs y arrays
+de numpy se serializan de forma nativa; cualquier otro tipo cae a str().
+"""
+
+try:
+    import orjson
+
+    _OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_SERIALIZE_DATACLASS
+    )
+
+    def dumps(obj, indent: int = 2) -> str:
+        """Serializa a str JSON (indentado a 2 espacios si indent)."""
+        return dumps_bytes(obj, indent).decode()
+
+    def dumps_bytes(obj, indent: int = 2) -> bytes:
+        """Serializa a bytes UTF-8, sin pasar por str."""
+        option = _OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option, default=str)
+
+    loads = orjson.loads
+
+except ImportError:
+    import dataclasses
+    import enum
+    import json
+
+    def _default(obj):
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if isinstance(obj, enum.Enum):
+            return obj.value
+        if hasattr(obj, "tolist"):
+            return obj.tolist()
+        return str(obj)
+
+    def dumps(obj, indent: int = 2) -> str:
+        """Serializa a str JSON (indentado si indent)."""
+        return json.dumps(obj, indent=indent or None, default=_default, ensure_ascii=False)
+
+    def dumps_bytes(obj, indent: int = 2) -> bytes:
+        """Serializa a bytes UTF-8."""
+        return dumps(obj, indent).encode("utf-8")
+
+    loads = json.loads
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Dependencias opcionales compartidas por los agentes.
+
+Se prueban bajo demanda (y una sola vez) para que importar un agente no
+cargue librerías pesadas que quizás no use.
+"""
+
+import functools
+
+
+@functools.lru_cache(maxsize=1)
+def numpy():
+    """numpy si está instalado (viene con pandas), o None."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Nombres de las tablas con configuracion de UI en StreamlitAgent.
+
+Modulo sin dependencias para que el CLI pueda armar las opciones de
+`streamlit mock --type` sin importar el agente completo.
+"""
+
+TABLE_UI_CONFIG_NAMES = (
+    "bd_recursos",
+    "bd_gastos",
+    "bd_jurisdiccion",
+    "bd_programas",
+    "bd_situacionpatrimonial",
+    "bd_movimientosTesoreria",
+    "bd_cuentas",
+    "bd_metas",
+)
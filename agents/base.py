@@ -6,9 +6,63 @@ Proporciona utilidades comunes: logging, timing, serialización.
 
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
-import json
+import os
+import queue
+import time
+
+from . import _json
+
+# Un solo handler/formatter para todos los agentes; el nombre de cada agente
+# sale de %(name)s del logger, no del format string.
+_SHARED_HANDLER: Optional[logging.Handler] = None
+
+# Con AGENTS_ASYNC_LOG=1 los registros se encolan y un thread aparte los
+# escribe en stderr, para que los loops de parsers no bloqueen en I/O.
+_LOG_LISTENER: Optional[QueueListener] = None
+
+
+def _get_shared_handler() -> logging.Handler:
+    """Retorna el handler compartido, creándolo la primera vez."""
+    global _SHARED_HANDLER, _LOG_LISTENER
+    if _SHARED_HANDLER is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(
+            "[%(asctime)s] [%(name)s] %(levelname)s: %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        ))
+        if os.environ.get("AGENTS_ASYNC_LOG") == "1":
+            log_queue = queue.SimpleQueue()
+            _LOG_LISTENER = QueueListener(log_queue, handler)
+            _LOG_LISTENER.start()
+            atexit.register(stop_log_listener)
+            handler = QueueHandler(log_queue)
+        _SHARED_HANDLER = handler
+    return _SHARED_HANDLER
+
+
+def stop_log_listener() -> None:
+    """
+    Vacía la cola de logs y detiene el listener asíncrono, si existe.
+
+    Los loggers de agentes vuelven al StreamHandler directo: lo que se loguee
+    después no queda en una cola que ya nadie lee.
+    """
+    global _LOG_LISTENER, _SHARED_HANDLER
+    if _LOG_LISTENER is None:
+        return
+    listener, _LOG_LISTENER = _LOG_LISTENER, None
+    queue_handler = _SHARED_HANDLER
+    stream_handler = listener.handlers[0]
+    _SHARED_HANDLER = stream_handler
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger) and queue_handler in logger.handlers:
+            logger.removeHandler(queue_handler)
+            logger.addHandler(stream_handler)
+    # Después del cambio: el listener termina de escribir lo que quedó encolado
+    listener.stop()
 
 
 class BaseAgent(ABC):
@@ -25,7 +79,7 @@ class BaseAgent(ABC):
         self.name = name
         self.verbose = verbose
         self.logger = self._setup_logger()
-        self._start_time: Optional[datetime] = None
+        self._start_ns: Optional[int] = None
 
     def _setup_logger(self) -> logging.Logger:
         """Configura el logger para el agente."""
@@ -33,35 +87,35 @@ class BaseAgent(ABC):
         logger.setLevel(logging.DEBUG if self.verbose else logging.INFO)
 
         if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                f"[%(asctime)s] [{self.name}] %(levelname)s: %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
+            logger.addHandler(_get_shared_handler())
 
         return logger
 
-    def log_info(self, message: str) -> None:
+    # Los log_* aceptan argumentos estilo %-format que se interpolan solo si
+    # el nivel está habilitado: preferir self.log_debug("row=%s", row) a
+    # f-strings en loops.
+
+    def log_info(self, message: str, *args: Any) -> None:
         """Log de nivel INFO."""
-        self.logger.info(message)
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(message, *args)
 
-    def log_warning(self, message: str) -> None:
+    def log_warning(self, message: str, *args: Any) -> None:
         """Log de nivel WARNING."""
-        self.logger.warning(message)
+        self.logger.warning(message, *args)
 
-    def log_error(self, message: str) -> None:
+    def log_error(self, message: str, *args: Any) -> None:
         """Log de nivel ERROR."""
-        self.logger.error(message)
+        self.logger.error(message, *args)
 
-    def log_debug(self, message: str) -> None:
+    def log_debug(self, message: str, *args: Any) -> None:
         """Log de nivel DEBUG (solo si verbose=True)."""
-        self.logger.debug(message)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(message, *args)
 
     def start_timer(self) -> None:
         """Inicia el timer de ejecución."""
-        self._start_time = datetime.now()
+        self._start_ns = time.perf_counter_ns()
 
     def stop_timer(self) -> float:
         """
@@ -70,10 +124,10 @@ class BaseAgent(ABC):
         Returns:
             Milisegundos desde start_timer(), o 0 si no se inició.
         """
-        if self._start_time is None:
+        if self._start_ns is None:
             return 0.0
-        elapsed = (datetime.now() - self._start_time).total_seconds() * 1000
-        self._start_time = None
+        elapsed = (time.perf_counter_ns() - self._start_ns) / 1_000_000
+        self._start_ns = None
         return elapsed
 
     def to_json(self, data: Any, indent: int = 2) -> str:
@@ -82,12 +136,13 @@ class BaseAgent(ABC):
 
         Args:
             data: Datos a serializar
-            indent: Espacios de indentación
+            indent: Espacios de indentación (con orjson, cualquier valor
+                    distinto de 0 indenta a 2)
 
         Returns:
             String JSON formateado
         """
-        return json.dumps(data, indent=indent, default=str, ensure_ascii=False)
+        return _json.dumps(data, indent=indent)
 
     def from_json(self, json_str: str) -> Any:
         """
@@ -99,7 +154,7 @@ class BaseAgent(ABC):
         Returns:
             Datos parseados
         """
-        return json.loads(json_str)
+        return _json.loads(json_str)
 
     def format_table(self, headers: list, rows: list, col_widths: list = None) -> str:
         """
@@ -113,34 +168,28 @@ class BaseAgent(ABC):
         Returns:
             String con tabla formateada
         """
+        headers_str = [str(h) for h in headers]
+        rows_str = [[str(c) for c in row] for row in rows]
+
         if col_widths is None:
-            col_widths = []
-            for i, h in enumerate(headers):
-                max_width = len(str(h))
-                for row in rows:
-                    if i < len(row):
-                        max_width = max(max_width, len(str(row[i])))
-                col_widths.append(max_width + 2)
-
-        lines = []
+            col_widths = [
+                max(len(h), max((len(r[i]) for r in rows_str if i < len(r)), default=0)) + 2
+                for i, h in enumerate(headers_str)
+            ]
+
+        def fmt(cells: list) -> str:
+            return "|" + "".join(
+                f" {c.ljust(w - 2)} |" for c, w in zip(cells, col_widths)
+            )
+
         separator = "+" + "+".join("-" * w for w in col_widths) + "+"
-        lines.append(separator)
-
-        header_line = "|"
-        for i, h in enumerate(headers):
-            header_line += f" {str(h):<{col_widths[i]-2}} |"
-        lines.append(header_line)
-        lines.append(separator)
-
-        for row in rows:
-            row_line = "|"
-            for i, cell in enumerate(row):
-                if i < len(col_widths):
-                    row_line += f" {str(cell):<{col_widths[i]-2}} |"
-            lines.append(row_line)
-
-        lines.append(separator)
-        return "\n".join(lines)
+        return "\n".join([
+            separator,
+            fmt(headers_str),
+            separator,
+            *(fmt(r) for r in rows_str),
+            separator,
+        ])
 
     @abstractmethod
     def health_check(self) -> Dict[str, Any]:
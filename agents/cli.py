@@ -7,21 +7,41 @@ Uso:
     python -m agents.cli supabase health
     python -m agents.cli pipeline test archivo.pdf
     python -m agents.cli streamlit generate tab --name X --table Y
+
+Con AGENTS_ASYNC_LOG=1 los logs se escriben desde un thread aparte
+(util con -v en `pipeline test` / `pipeline benchmark`).
+
+AGENTS_PDF_BACKEND=pymupdf|pypdfium2|auto cambia el motor de extraccion de
+texto del agente pipeline (default pdfplumber, igual que el pipeline real).
 """
 
 import argparse
+import functools
 import sys
-import json
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-from .config import AgentConfig
-from .supabase_agent import SupabaseAgent
-from .pipeline_agent import PipelineAgent
-from .streamlit_agent import StreamlitAgent
+from . import _json
+from ._tables import TABLE_UI_CONFIG_NAMES
 
+# Los agentes se importan recien en main(), dentro de la rama que los usa:
+# asi `--help` o `supabase health` no cargan el stack de PDFs ni el de UI.
+if TYPE_CHECKING:
+    from .supabase_agent import SupabaseAgent
+    from .pipeline_agent import PipelineAgent
+    from .streamlit_agent import StreamlitAgent
+
+
+AGENT_HELP = {
+    "supabase": "Agente de base de datos Supabase",
+    "pipeline": "Agente de pipeline de PDFs",
+    "streamlit": "Agente de UI Streamlit",
+}
+
+
+def _create_base_parser() -> tuple:
+    """Crea el parser principal con los flags globales, sin subcomandos."""
+    from . import __version__
 
-def create_parser() -> argparse.ArgumentParser:
-    """Crea el parser principal de argumentos."""
     parser = argparse.ArgumentParser(
         prog="agents",
         description="CLI de agentes para MunicipiosPBA",
@@ -44,14 +64,19 @@ Ejemplos:
         action="store_true",
         help="Modo verbose (mas detalle en logs)",
     )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=f"%(prog)s {__version__}",
+    )
 
     subparsers = parser.add_subparsers(dest="agent", help="Agente a usar")
+    return parser, subparsers
 
-    # === SUPABASE AGENT ===
-    supabase_parser = subparsers.add_parser(
-        "supabase",
-        help="Agente de base de datos Supabase",
-    )
+
+def _add_supabase_parser(subparsers) -> None:
+    """Agrega el subparser del agente Supabase."""
+    supabase_parser = subparsers.add_parser("supabase", help=AGENT_HELP["supabase"])
     supabase_sub = supabase_parser.add_subparsers(dest="command")
 
     # supabase health
@@ -64,6 +89,11 @@ Ejemplos:
         nargs="?",
         help="Tabla a inspeccionar (omitir para todas)",
     )
+    inspect_parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Conteo exacto de registros (default: estimado)",
+    )
 
     # supabase diagnose
     diagnose_parser = supabase_sub.add_parser("diagnose", help="Ejecutar diagnosticos")
@@ -122,11 +152,10 @@ Ejemplos:
         help="ID de municipio",
     )
 
-    # === PIPELINE AGENT ===
-    pipeline_parser = subparsers.add_parser(
-        "pipeline",
-        help="Agente de pipeline de PDFs",
-    )
+
+def _add_pipeline_parser(subparsers) -> None:
+    """Agrega el subparser del agente Pipeline."""
+    pipeline_parser = subparsers.add_parser("pipeline", help=AGENT_HELP["pipeline"])
     pipeline_sub = pipeline_parser.add_subparsers(dest="command")
 
     # pipeline health
@@ -189,11 +218,10 @@ Ejemplos:
         help="Iteraciones",
     )
 
-    # === STREAMLIT AGENT ===
-    streamlit_parser = subparsers.add_parser(
-        "streamlit",
-        help="Agente de UI Streamlit",
-    )
+
+def _add_streamlit_parser(subparsers) -> None:
+    """Agrega el subparser del agente Streamlit."""
+    streamlit_parser = subparsers.add_parser("streamlit", help=AGENT_HELP["streamlit"])
     streamlit_sub = streamlit_parser.add_subparsers(dest="command")
 
     # streamlit health
@@ -214,7 +242,7 @@ Ejemplos:
     mock_parser = streamlit_sub.add_parser("mock", help="Generar datos mock")
     mock_parser.add_argument(
         "--type",
-        choices=["municipio", "document", "session-state"] + list(StreamlitAgent.TABLE_UI_CONFIGS.keys()),
+        choices=("municipio", "document", "session-state") + TABLE_UI_CONFIG_NAMES,
         default="municipio",
         help="Tipo de datos",
     )
@@ -236,26 +264,108 @@ Ejemplos:
     # streamlit list-tables
     streamlit_sub.add_parser("list-tables", help="Listar tablas configuradas")
 
+
+_AGENT_BUILDERS = {
+    "supabase": _add_supabase_parser,
+    "pipeline": _add_pipeline_parser,
+    "streamlit": _add_streamlit_parser,
+}
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Crea el parser principal de argumentos (arbol completo)."""
+    parser, subparsers = _create_base_parser()
+    for build in _AGENT_BUILDERS.values():
+        build(subparsers)
+    return parser
+
+
+def create_parser_for(agent_name: Optional[str]) -> argparse.ArgumentParser:
+    """
+    Crea un parser que solo arma los subcomandos del agente invocado.
+
+    Los otros agentes quedan registrados como opciones (para --help y
+    mensajes de error) pero sin sus subcomandos.
+
+    Args:
+        agent_name: Agente detectado en argv, o None
+
+    Returns:
+        ArgumentParser listo para parse_args
+    """
+    parser, subparsers = _create_base_parser()
+    for name, build in _AGENT_BUILDERS.items():
+        if name == agent_name:
+            build(subparsers)
+        else:
+            subparsers.add_parser(name, help=AGENT_HELP[name])
     return parser
 
 
-def handle_supabase_command(agent: SupabaseAgent, args) -> int:
+@functools.lru_cache(maxsize=4)
+def _build_parser(agent_name: Optional[str]) -> argparse.ArgumentParser:
+    """
+    create_parser_for memoizado por agente, para llamadas repetidas a main()
+    (tests, REPL). parse_args no modifica el parser, asi que reusarlo es seguro.
+    """
+    return create_parser_for(agent_name)
+
+
+def _sniff_subcommand(argv: List[str]) -> Optional[str]:
+    """Retorna el agente pedido (primer token que no es flag) o None."""
+    for token in argv:
+        if not token.startswith("-"):
+            return token if token in AGENT_HELP else None
+    return None
+
+
+def _write_result(payload) -> None:
+    """
+    Escribe un resultado en stdout seguido de newline. Los bytes (de
+    _json.dumps_bytes) van directo a stdout.buffer, sin decodificar.
+    """
+    if isinstance(payload, bytes):
+        out = getattr(sys.stdout, "buffer", None)
+        if out is not None:
+            sys.stdout.flush()  # respetar el orden con lo ya impreso
+            out.write(payload)
+            out.write(b"\n")
+            return
+        payload = payload.decode("utf-8")
+    sys.stdout.write(payload + "\n")
+
+
+def _write_chunks(chunks) -> None:
+    """Escribe en stdout trozos de bytes a medida que llegan, más un newline final."""
+    out = getattr(sys.stdout, "buffer", None)
+    sys.stdout.flush()
+    for chunk in chunks:
+        if out is not None:
+            out.write(chunk)
+        else:
+            sys.stdout.write(chunk.decode("utf-8"))
+    _write_result(b"")
+
+
+def handle_supabase_command(agent: "SupabaseAgent", args) -> int:
     """Maneja comandos del agente Supabase."""
     if args.command == "health":
         result = agent.health_check()
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        _write_result(_json.dumps_bytes(result))
         return 0 if result["status"] == "ok" else 1
 
     elif args.command == "inspect":
         if args.table:
-            info = agent.inspect_table(args.table)
-            print(f"Tabla: {info.name}")
-            print(f"PK: {info.pk_column}")
-            print(f"Registros: {info.row_count}")
-            print(f"FKs: {info.fk_columns}")
-            print(f"Descripcion: {info.description}")
+            info = agent.inspect_table(args.table, exact=args.exact)
+            sys.stdout.write("\n".join([
+                f"Tabla: {info.name}",
+                f"PK: {info.pk_column}",
+                f"Registros: {info.row_count}",
+                f"FKs: {info.fk_columns}",
+                f"Descripcion: {info.description}",
+            ]) + "\n")
         else:
-            summary = agent.get_table_summary()
+            summary = agent.get_table_summary(exact=args.exact)
             print(summary)
         return 0
 
@@ -269,14 +379,16 @@ def handle_supabase_command(agent: SupabaseAgent, args) -> int:
         return 0
 
     elif args.command == "export":
-        data = agent.export_table_data(args.table, format=args.format)
-        print(data)
+        if args.format == "csv":
+            _write_chunks(agent.iter_export_csv(args.table))
+        else:
+            _write_chunks(agent.iter_export_json(args.table))
         return 0
 
     elif args.command == "cleanup":
         dry_run = not args.execute
         result = agent.cleanup_orphan_records(args.table, dry_run=dry_run)
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        _write_result(_json.dumps_bytes(result))
         return 0 if result["status"] in ("ok", "preview") else 1
 
     elif args.command == "count":
@@ -287,7 +399,7 @@ def handle_supabase_command(agent: SupabaseAgent, args) -> int:
         else:
             print("Especifica --doc-id o --muni-id")
             return 1
-        print(json.dumps(counts, indent=2))
+        _write_result(_json.dumps_bytes(counts))
         return 0
 
     else:
@@ -295,25 +407,27 @@ def handle_supabase_command(agent: SupabaseAgent, args) -> int:
         return 1
 
 
-def handle_pipeline_command(agent: PipelineAgent, args) -> int:
+def handle_pipeline_command(agent: "PipelineAgent", args) -> int:
     """Maneja comandos del agente Pipeline."""
     if args.command == "health":
         result = agent.health_check()
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        _write_result(_json.dumps_bytes(result))
         return 0 if result["status"] == "ok" else 1
 
     elif args.command == "test":
         if args.parser:
             result = agent.run_parser_on_pdf(args.pdf_path, args.parser)
-            print(f"Parser: {result.parser_name}")
-            print(f"Filas: {len(result.rows)}")
-            print(f"Tiempo: {result.execution_time_ms:.0f}ms")
-            print(f"Warnings: {len(result.warnings)}")
-            print(f"Errors: {result.errors}")
+            lines = [
+                f"Parser: {result.parser_name}",
+                f"Filas: {len(result.rows)}",
+                f"Tiempo: {result.execution_time_ms:.0f}ms",
+                f"Warnings: {len(result.warnings)}",
+                f"Errors: {result.errors}",
+            ]
             if result.rows:
-                print("\nPrimeras 3 filas:")
-                for row in result.rows[:3]:
-                    print(f"  {row}")
+                lines.append("\nPrimeras 3 filas:")
+                lines.extend(f"  {row}" for row in result.rows[:3])
+            sys.stdout.write("\n".join(lines) + "\n")
         else:
             results = agent.run_all_parsers_on_pdf(args.pdf_path)
             report = agent.generate_parsing_report(results)
@@ -321,30 +435,36 @@ def handle_pipeline_command(agent: PipelineAgent, args) -> int:
         return 0
 
     elif args.command == "extract-text":
-        pdf_bytes = agent.load_pdf(args.pdf_path)
-
         page_range = None
         if args.pages:
-            parts = args.pages.split("-")
-            page_range = (int(parts[0]), int(parts[1]) if len(parts) > 1 else int(parts[0]))
+            start, sep, end = args.pages.partition("-")
+            try:
+                lo = int(start)
+                hi = int(end) if sep else lo
+            except ValueError:
+                print("Invalid --pages; expected N or N-M")
+                return 2
+            page_range = (lo, hi)
 
+        pdf_bytes = agent.load_pdf(args.pdf_path)
         pages = agent.extract_text_by_page(pdf_bytes, page_range)
 
-        output_text = ""
+        parts = []
         for p in pages:
-            output_text += f"\n=== PAGINA {p['page_num']} ({p['char_count']} chars) ===\n"
-            output_text += p["text"]
+            parts.append(f"\n=== PAGINA {p['page_num']} ({p['char_count']} chars) ===\n")
+            parts.append(p["text"])
 
         if args.output:
-            with open(args.output, "w", encoding="utf-8") as f:
-                f.write(output_text)
+            with open(args.output, "w", encoding="utf-8", buffering=1 << 20) as f:
+                f.writelines(parts)
             print(f"Texto guardado en: {args.output}")
         else:
-            print(output_text)
+            sys.stdout.writelines(parts)
+            sys.stdout.write("\n")
         return 0
 
     elif args.command == "debug":
-        result = agent.debug_extraction(args.pdf_path)
+        result = agent.debug_extraction(args.pdf_path, include_full_text=bool(args.section))
         print(f"PDF: {result['pdf_path']}")
         print(f"Paginas: {result['total_pages']}")
         print(f"Caracteres totales: {result['total_chars']}")
@@ -353,8 +473,7 @@ def handle_pipeline_command(agent: PipelineAgent, args) -> int:
             print(f"Paginas vacias: {result['empty_pages']}")
 
         if args.section:
-            text = "\n".join(p["text"] for p in result["pages"])
-            section_result = agent.find_section(text, args.section)
+            section_result = agent.find_section(result["full_text"], args.section)
             print(f"\nBusqueda de '{args.section}':")
             if section_result["found"]:
                 print(f"  Encontrado en posicion {section_result['start_pos']}")
@@ -377,13 +496,12 @@ def handle_pipeline_command(agent: PipelineAgent, args) -> int:
         else:
             data = agent.generate_sample_data(args.type, args.count)
 
-        output = json.dumps(data, indent=2, ensure_ascii=False)
         if args.output:
-            with open(args.output, "w", encoding="utf-8") as f:
-                f.write(output)
+            with open(args.output, "wb") as f:
+                f.write(_json.dumps_bytes(data))
             print(f"Datos guardados en: {args.output}")
         else:
-            print(output)
+            _write_result(_json.dumps_bytes(data))
         return 0
 
     elif args.command == "benchmark":
@@ -404,11 +522,11 @@ def handle_pipeline_command(agent: PipelineAgent, args) -> int:
         return 1
 
 
-def handle_streamlit_command(agent: StreamlitAgent, args) -> int:
+def handle_streamlit_command(agent: "StreamlitAgent", args) -> int:
     """Maneja comandos del agente Streamlit."""
     if args.command == "health":
         result = agent.health_check()
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        _write_result(_json.dumps_bytes(result))
         return 0
 
     elif args.command == "generate":
@@ -452,19 +570,18 @@ def handle_streamlit_command(agent: StreamlitAgent, args) -> int:
         else:
             data = agent.generate_mock_table_data(args.type, args.count)
 
-        output = json.dumps(data, indent=2, ensure_ascii=False)
         if args.output:
-            with open(args.output, "w", encoding="utf-8") as f:
-                f.write(output)
+            with open(args.output, "wb") as f:
+                f.write(_json.dumps_bytes(data))
             print(f"Datos guardados en: {args.output}")
         else:
-            print(output)
+            _write_result(_json.dumps_bytes(data))
         return 0
 
     elif args.command == "validate-session":
         if args.state_file:
             with open(args.state_file, "r", encoding="utf-8") as f:
-                state = json.load(f)
+                state = _json.loads(f.read())
         else:
             state = {}
 
@@ -479,12 +596,13 @@ def handle_streamlit_command(agent: StreamlitAgent, args) -> int:
 
     elif args.command == "list-tables":
         tables = agent.list_available_tables()
-        print("Tablas con configuracion UI:")
+        lines = ["Tablas con configuracion UI:"]
         for t in tables:
             config = agent.get_table_ui_config(t)
-            print(f"  {t}")
-            print(f"    PK: {config.get('pk')}")
-            print(f"    Editables: {len(config.get('editable', []))} columnas")
+            lines.append(f"  {t}")
+            lines.append(f"    PK: {config.get('pk')}")
+            lines.append(f"    Editables: {len(config.get('editable', []))} columnas")
+        sys.stdout.write("\n".join(lines) + "\n")
         return 0
 
     else:
@@ -494,8 +612,17 @@ def handle_streamlit_command(agent: StreamlitAgent, args) -> int:
 
 def main(args: List[str] = None) -> int:
     """Punto de entrada principal del CLI."""
-    parser = create_parser()
-    parsed = parser.parse_args(args)
+    argv = sys.argv[1:] if args is None else list(args)
+    agent_name = _sniff_subcommand(argv)
+
+    # --version no necesita armar ningun parser
+    if agent_name is None and "--version" in argv:
+        from . import __version__
+        print(f"agents {__version__}")
+        return 0
+
+    parser = _build_parser(agent_name)
+    parsed = parser.parse_args(argv)
 
     if not parsed.agent:
         parser.print_help()
@@ -505,15 +632,22 @@ def main(args: List[str] = None) -> int:
 
     try:
         if parsed.agent == "supabase":
+            from .config import AgentConfig
+            from .supabase_agent import SupabaseAgent
+
             config = AgentConfig.from_streamlit_secrets()
             agent = SupabaseAgent(config=config, verbose=verbose)
             return handle_supabase_command(agent, parsed)
 
         elif parsed.agent == "pipeline":
+            from .pipeline_agent import PipelineAgent
+
             agent = PipelineAgent(verbose=verbose)
             return handle_pipeline_command(agent, parsed)
 
         elif parsed.agent == "streamlit":
+            from .streamlit_agent import StreamlitAgent
+
             agent = StreamlitAgent(verbose=verbose)
             return handle_streamlit_command(agent, parsed)
 
@@ -521,6 +655,9 @@ def main(args: List[str] = None) -> int:
             parser.print_help()
             return 1
 
+    except KeyboardInterrupt:
+        return 130
+
     except Exception as e:
         print(f"Error: {e}")
         if verbose:
@@ -528,6 +665,10 @@ def main(args: List[str] = None) -> int:
             traceback.print_exc()
         return 1
 
+    finally:
+        from .base import stop_log_listener
+        stop_log_listener()
+
 
 if __name__ == "__main__":
     sys.exit(main())
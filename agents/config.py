@@ -4,9 +4,155 @@ Gestión de configuración para los agentes.
 Soporta carga desde Streamlit secrets, variables de entorno, o valores directos.
 """
 
+from collections import defaultdict
 from dataclasses import dataclass, field
 from typing import Any, Optional
+import functools
 import os
+import threading
+
+
+# supabase.create_client, importado una sola vez (ver _get_create_client)
+_create_client = None
+_import_lock = threading.Lock()
+
+# secrets.toml ya parseado, por ruta: {path: (mtime, secrets)}
+_SECRETS_CACHE: dict = {}
+
+
+# Ubicacion de secrets.toml ya encontrada, por cwd: {cwd: path}
+_SECRETS_PATHS: dict = {}
+
+
+def _resolve_secrets_path(cwd: str) -> Optional[str]:
+    """
+    Primera ubicacion conocida de secrets.toml que existe (por cwd).
+    Solo se cachean los aciertos: si todavia no existe, se vuelve a buscar
+    en la proxima llamada.
+    """
+    cached = _SECRETS_PATHS.get(cwd)
+    if cached is not None:
+        return cached
+
+    possible_paths = [
+        os.path.join(cwd, ".streamlit", "secrets.toml"),
+        os.path.join(os.path.dirname(__file__), "..", ".streamlit", "secrets.toml"),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            _SECRETS_PATHS[cwd] = path
+            return path
+    return None
+
+
+def _load_secrets(secrets_path: str) -> Optional[dict]:
+    """
+    Parsea secrets.toml, reusando el resultado mientras el mtime no cambie.
+    Retorna None si el archivo no existe.
+    """
+    try:
+        mtime = os.stat(secrets_path).st_mtime
+    except OSError:
+        return None
+
+    cached = _SECRETS_CACHE.get(secrets_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    import toml
+    secrets = toml.load(secrets_path)
+    _SECRETS_CACHE[secrets_path] = (mtime, secrets)
+    return secrets
+
+
+def _get_create_client():
+    """Importa supabase.create_client la primera vez y lo reusa."""
+    global _create_client
+    if _create_client is None:
+        with _import_lock:
+            if _create_client is None:
+                try:
+                    from supabase import create_client
+                except ImportError:
+                    raise ImportError(
+                        "El paquete 'supabase' no está instalado. "
+                        "Ejecuta: pip install supabase"
+                    )
+                _create_client = create_client
+    return _create_client
+
+
+@functools.lru_cache(maxsize=1)
+def _env_snapshot() -> tuple:
+    """
+    Lee una sola vez las variables de entorno de from_env.
+    Si se modifican en runtime, llamar a _env_snapshot.cache_clear().
+    """
+    env = os.environ
+    return (
+        env.get("SUPABASE_URL"),
+        env.get("SUPABASE_KEY"),
+        env.get("AGENT_VERBOSE", "").lower() == "true",
+        env.get("PDF_DIRECTORY", "PDFS"),
+    )
+
+
+# Definiciones de tablas del proyecto, compartidas por todas las instancias de
+# AgentConfig: tratarlas como solo lectura (no modificar in-place). Para
+# cambiarlas, asignar a `tables` una copia (copy.deepcopy(_DEFAULT_TABLES)).
+# Son dicts comunes y no MappingProxyType para que asdict/deepcopy sigan andando.
+_DEFAULT_TABLES = {
+    "bd_municipios": {
+        "pk": "ID_Municipio",
+        "fk": (),
+        "description": "Municipios de Buenos Aires",
+    },
+    "BD_DocumentosCargados": {
+        "pk": "ID_DocumentoCargado",
+        "fk": (("ID_Municipio", "bd_municipios"),),
+        "description": "Documentos PDF cargados",
+    },
+    "bd_recursos": {
+        "pk": "ID_Recurso",
+        "fk": (("ID_DocumentoCargado", "BD_DocumentosCargados"),),
+        "description": "Recursos/ingresos",
+    },
+    "bd_gastos": {
+        "pk": "ID_Gasto",
+        "fk": (("ID_DocumentoCargado", "BD_DocumentosCargados"),),
+        "description": "Gastos/egresos",
+    },
+    "bd_jurisdiccion": {
+        "pk": "ID_Jurisdiccion",
+        "fk": (("ID_DocumentoCargado", "BD_DocumentosCargados"),),
+        "description": "Jurisdicciones administrativas",
+    },
+    "bd_programas": {
+        "pk": "ID_Programa",
+        "fk": (("ID_Jurisdiccion", "bd_jurisdiccion"),),
+        "description": "Programas de gobierno",
+    },
+    "bd_situacionpatrimonial": {
+        "pk": "ID_SituacionPatrimonial",
+        "fk": (("ID_DocumentoCargado", "BD_DocumentosCargados"),),
+        "description": "Situacion patrimonial (activo/pasivo)",
+    },
+    "bd_movimientosTesoreria": {
+        "pk": "ID_MovimientoTesoreria",
+        "fk": (("ID_DocumentoCargado", "BD_DocumentosCargados"),),
+        "description": "Movimientos de tesoreria",
+    },
+    "bd_cuentas": {
+        "pk": "ID_Cuenta",
+        "fk": (("ID_DocumentoCargado", "BD_DocumentosCargados"),),
+        "description": "Cuentas bancarias/caja",
+    },
+    "bd_metas": {
+        "pk": "ID_Meta",
+        "fk": (("ID_Programa", "bd_programas"),),
+        "description": "Metas/objetivos de programas",
+    },
+}
 
 
 @dataclass
@@ -19,59 +165,34 @@ class AgentConfig:
     log_file: Optional[str] = None
     pdf_directory: str = "PDFS"
 
-    # Definiciones de tablas del proyecto
-    tables: dict = field(default_factory=lambda: {
-        "bd_municipios": {
-            "pk": "ID_Municipio",
-            "fk": [],
-            "description": "Municipios de Buenos Aires",
-        },
-        "BD_DocumentosCargados": {
-            "pk": "ID_DocumentoCargado",
-            "fk": [("ID_Municipio", "bd_municipios")],
-            "description": "Documentos PDF cargados",
-        },
-        "bd_recursos": {
-            "pk": "ID_Recurso",
-            "fk": [("ID_DocumentoCargado", "BD_DocumentosCargados")],
-            "description": "Recursos/ingresos",
-        },
-        "bd_gastos": {
-            "pk": "ID_Gasto",
-            "fk": [("ID_DocumentoCargado", "BD_DocumentosCargados")],
-            "description": "Gastos/egresos",
-        },
-        "bd_jurisdiccion": {
-            "pk": "ID_Jurisdiccion",
-            "fk": [("ID_DocumentoCargado", "BD_DocumentosCargados")],
-            "description": "Jurisdicciones administrativas",
-        },
-        "bd_programas": {
-            "pk": "ID_Programa",
-            "fk": [("ID_Jurisdiccion", "bd_jurisdiccion")],
-            "description": "Programas de gobierno",
-        },
-        "bd_situacionpatrimonial": {
-            "pk": "ID_SituacionPatrimonial",
-            "fk": [("ID_DocumentoCargado", "BD_DocumentosCargados")],
-            "description": "Situacion patrimonial (activo/pasivo)",
-        },
-        "bd_movimientosTesoreria": {
-            "pk": "ID_MovimientoTesoreria",
-            "fk": [("ID_DocumentoCargado", "BD_DocumentosCargados")],
-            "description": "Movimientos de tesoreria",
-        },
-        "bd_cuentas": {
-            "pk": "ID_Cuenta",
-            "fk": [("ID_DocumentoCargado", "BD_DocumentosCargados")],
-            "description": "Cuentas bancarias/caja",
-        },
-        "bd_metas": {
-            "pk": "ID_Meta",
-            "fk": [("ID_Programa", "bd_programas")],
-            "description": "Metas/objetivos de programas",
-        },
-    })
+    # Definiciones de tablas del proyecto (solo lectura, ver _DEFAULT_TABLES)
+    tables: dict = field(default_factory=lambda: _DEFAULT_TABLES)
+
+    # Indices derivados de `tables`: nombres de tablas e inverso padre -> hijas
+    _table_names: Optional[tuple] = field(
+        init=False, repr=False, compare=False, default=None
+    )
+    _children_by_parent: Optional[dict] = field(
+        init=False, repr=False, compare=False, default=None
+    )
+    _index_source: Optional[dict] = field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    def _build_indexes(self) -> None:
+        """Arma los indices derivados de `tables` en una sola pasada."""
+        children = defaultdict(list)
+        for table_name, info in self.tables.items():
+            for parent in dict.fromkeys(fk_table for _, fk_table in info.get("fk", [])):
+                children[parent].append(table_name)
+        self._table_names = tuple(self.tables)
+        self._children_by_parent = {k: tuple(v) for k, v in children.items()}
+        self._index_source = self.tables
+
+    def _ensure_indexes(self) -> None:
+        """Reconstruye los indices si `tables` fue reemplazado."""
+        if self._index_source is not self.tables:
+            self._build_indexes()
 
     @classmethod
     def from_streamlit_secrets(cls, secrets_path: str = None) -> "AgentConfig":
@@ -87,24 +208,17 @@ class AgentConfig:
         """
         if secrets_path is None:
             # Buscar en ubicaciones comunes
-            possible_paths = [
-                ".streamlit/secrets.toml",
-                os.path.join(os.path.dirname(__file__), "..", ".streamlit", "secrets.toml"),
-            ]
-            for path in possible_paths:
-                if os.path.exists(path):
-                    secrets_path = path
-                    break
-
-        if secrets_path and os.path.exists(secrets_path):
+            secrets_path = _resolve_secrets_path(os.getcwd())
+
+        if secrets_path:
             try:
-                import toml
-                secrets = toml.load(secrets_path)
-                supabase = secrets.get("supabase", {})
-                return cls(
-                    supabase_url=supabase.get("url"),
-                    supabase_key=supabase.get("key"),
-                )
+                secrets = _load_secrets(secrets_path)
+                if secrets is not None:
+                    supabase = secrets.get("supabase", {})
+                    return cls(
+                        supabase_url=supabase.get("url"),
+                        supabase_key=supabase.get("key"),
+                    )
             except ImportError:
                 # Si toml no está instalado, intentar parseo manual
                 pass
@@ -127,11 +241,12 @@ class AgentConfig:
         Returns:
             AgentConfig con valores de entorno
         """
+        url, key, verbose, pdf_directory = _env_snapshot()
         return cls(
-            supabase_url=os.environ.get("SUPABASE_URL"),
-            supabase_key=os.environ.get("SUPABASE_KEY"),
-            verbose=os.environ.get("AGENT_VERBOSE", "").lower() == "true",
-            pdf_directory=os.environ.get("PDF_DIRECTORY", "PDFS"),
+            supabase_url=url,
+            supabase_key=key,
+            verbose=verbose,
+            pdf_directory=pdf_directory,
         )
 
     @classmethod
@@ -170,14 +285,21 @@ class AgentConfig:
                 "Configura via secrets.toml o variables de entorno."
             )
 
-        try:
-            from supabase import create_client
+        from pipeline.load_supabase import shared_http_client
+
+        create_client = _get_create_client()
+        http_client = shared_http_client()
+        if http_client is None:
             return create_client(self.supabase_url, self.supabase_key)
-        except ImportError:
-            raise ImportError(
-                "El paquete 'supabase' no está instalado. "
-                "Ejecuta: pip install supabase"
-            )
+
+        from supabase import ClientOptions
+        # ClientOptions es por cliente (create_client le agrega headers); solo
+        # se comparte el pool de conexiones
+        return create_client(
+            self.supabase_url,
+            self.supabase_key,
+            options=ClientOptions(httpx_client=http_client),
+        )
 
     def get_table_info(self, table_name: str) -> Optional[dict]:
         """
@@ -191,27 +313,26 @@ class AgentConfig:
         """
         return self.tables.get(table_name)
 
-    def get_all_tables(self) -> list:
-        """Retorna lista de nombres de tablas."""
-        return list(self.tables.keys())
+    def get_all_tables(self) -> tuple:
+        """Retorna tupla de nombres de tablas (calculada una vez, ver get_child_tables)."""
+        self._ensure_indexes()
+        return self._table_names
 
-    def get_child_tables(self, parent_table: str) -> list:
+    def get_child_tables(self, parent_table: str) -> tuple:
         """
         Obtiene tablas hijas de una tabla padre.
 
+        Si se reemplaza `tables` los indices se reconstruyen solos; si se
+        modifica el dict in-place, llamar a _build_indexes().
+
         Args:
             parent_table: Nombre de la tabla padre
 
         Returns:
-            Lista de nombres de tablas hijas
+            Tupla de nombres de tablas hijas
         """
-        children = []
-        for table_name, info in self.tables.items():
-            for fk_col, fk_table in info.get("fk", []):
-                if fk_table == parent_table:
-                    children.append(table_name)
-                    break
-        return children
+        self._ensure_indexes()
+        return self._children_by_parent.get(parent_table, ())
 
     def validate(self) -> tuple:
         """
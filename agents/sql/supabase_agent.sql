@@ -0,0 +1,140 @@
+-- Funciones RPC que usa SupabaseAgent (agents/supabase_agent.py).
+--
+-- Correr una vez en el SQL editor de Supabase. Son opcionales: si una función
+-- no existe, el agente cae al camino anterior (traer filas y resolver en
+-- Python), que es equivalente pero mueve mucho más por la red.
+--
+-- Los nombres de tabla/columna llegan como parámetros y se interpolan con
+-- format('%I'), que los cita como identificadores.
+
+-- Registros de child_table cuyo fk_col no tiene fila en parent_table.
+create or replace function public.find_orphans(
+    child_table text,
+    child_pk text,
+    fk_col text,
+    parent_table text,
+    parent_pk text
+)
+returns table (child_id text, fk_value text)
+language plpgsql
+stable
+as $$
+begin
+    return query execute format(
+        'select c.%2$I::text, c.%3$I::text
+           from public.%1$I c
+          where c.%3$I is not null
+            and c.%3$I::text <> ''''
+            and not exists (
+                select 1 from public.%4$I p where p.%5$I = c.%3$I
+            )',
+        child_table, child_pk, fk_col, parent_table, parent_pk
+    );
+end;
+$$;
+
+-- Grupos de filas de tbl que repiten los valores de cols. ids va ordenado
+-- por PK: el primero es el original y el resto sus duplicados.
+create or replace function public.find_dupes(
+    tbl text,
+    pk text,
+    cols text[]
+)
+returns table (key jsonb, ids text[])
+language plpgsql
+stable
+as $$
+declare
+    group_cols text := (select string_agg(format('%I', c), ', ') from unnest(cols) c);
+    key_pairs text := (select string_agg(format('%L, %I', c, c), ', ') from unnest(cols) c);
+begin
+    return query execute format(
+        'select jsonb_build_object(%s), array_agg(%I::text order by %I)
+           from public.%I
+          group by %s
+         having count(*) > 1',
+        key_pairs, pk, pk, tbl, group_cols
+    );
+end;
+$$;
+
+-- Cantidad de filas de cada tabla de `tables` que cuelgan de alguno de los
+-- documentos doc_ids.
+create or replace function public.count_by_docs(
+    tables text[],
+    doc_ids uuid[]
+)
+returns table (table_name text, cnt bigint)
+language plpgsql
+stable
+as $$
+declare
+    t text;
+begin
+    foreach t in array tables loop
+        table_name := t;
+        execute format(
+            'select count(*) from public.%I where "ID_DocumentoCargado" = any($1)', t
+        ) into cnt using doc_ids;
+        return next;
+    end loop;
+end;
+$$;
+
+-- De los valores candidates, los que no existen como parent_pk en
+-- parent_table. El cast al tipo del PK deja usar su índice.
+create or replace function public.missing_parents(
+    parent_table text,
+    parent_pk text,
+    candidates text[]
+)
+returns table (value text)
+language plpgsql
+stable
+as $$
+declare
+    pk_type text;
+begin
+    select format_type(a.atttypid, a.atttypmod) into pk_type
+      from pg_attribute a
+     where a.attrelid = format('public.%I', parent_table)::regclass
+       and a.attname = parent_pk;
+
+    return query execute format(
+        'select v from unnest($1) v
+          where not exists (select 1 from public.%I p where p.%I = v::%s)',
+        parent_table, parent_pk, pk_type
+    ) using candidates;
+end;
+$$;
+
+-- Todos los chequeos de huérfanos de una vez (ver find_orphans). checks es
+-- un array de {child_table, child_pk, fk_col, parent_table, parent_pk};
+-- devuelve un array en el mismo orden con los huérfanos de cada chequeo.
+create or replace function public.run_diagnostics(checks jsonb)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+    c jsonb;
+    report jsonb := '[]'::jsonb;
+begin
+    for c in select value from jsonb_array_elements(checks) loop
+        report := report || jsonb_build_array(jsonb_build_object(
+            'child_table', c->>'child_table',
+            'fk_col', c->>'fk_col',
+            'orphans', coalesce((
+                select jsonb_agg(jsonb_build_object(
+                    'child_id', o.child_id, 'fk_value', o.fk_value
+                ))
+                  from public.find_orphans(
+                      c->>'child_table', c->>'child_pk', c->>'fk_col',
+                      c->>'parent_table', c->>'parent_pk'
+                  ) o
+            ), '[]'::jsonb)
+        ));
+    end loop;
+    return report;
+end;
+$$;
@@ -7,18 +7,260 @@ Funciones principales:
 - Generación de boilerplate para tabs/forms
 - Generación de datos mock para testing
 - Validación de configuraciones de componentes
+
+Perfil de performance:
+    El trabajo de este módulo es armar strings (boilerplate), leer dicts de
+    configuración y generar ids/valores aleatorios para los mocks: está
+    dominado por allocations y lookups de atributos/claves, no por cómputo
+    numérico. No tiene sentido Numba/JIT acá; lo que rinde es precalcular la
+    configuración y cachear resultados. El único camino numérico en bloque es
+    generate_mock_table_data (columnas de importes), que usa numpy si está.
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Type
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple, Type
+import functools
+import os
 import random
-import uuid
+import string
 
+from ._optional import numpy as _numpy
+from ._tables import TABLE_UI_CONFIG_NAMES
 from .base import BaseAgent
 from .config import AgentConfig
 
 
-@dataclass
+# Valores para generate_mock_municipio / generate_mock_document
+_NOMBRES_MUNI = (
+    "San Isidro", "Tigre", "Vicente Lopez", "La Plata",
+    "Quilmes", "Lomas de Zamora", "Avellaneda", "Moron",
+)
+_DOC_TIPOS = ("Rendicion", "Presupuesto")
+_PERIODOS = ("Q1", "Q2", "Q3", "Q4", "Anual")
+_ESTADOS = ("Pendiente", "Procesando", "Procesado", "Error")
+
+
+def _mock_id() -> str:
+    """ID aleatorio para datos mock: 32 dígitos hex (Postgres lo acepta como uuid)."""
+    return os.urandom(16).hex()
+
+
+# Plantillas de los generadores de código. Con string.Template las llaves del
+# código generado (f-strings de Streamlit) van literales, sin escapar.
+_TAB_HEADER_TMPL = string.Template('''
+# === Tab: $tab_name ===
+with tab_$tab_l:
+    st.subheader("$tab_name")
+
+    # Verificar documento seleccionado
+    if not doc_id_sel:
+        st.warning("Selecciona un documento primero")
+    else:
+        # Fetch data
+        $df_var = fetch_data_$tab_l(supabase, doc_id_sel)
+
+        if $df_var.empty:
+            st.info("Sin datos cargados para este documento")
+        else:
+            # Mostrar metricas
+            cols_metrics = st.columns($n_cols)
+''')
+
+_METRIC_CELL_TMPL = string.Template('''\
+            with cols_metrics[$i]:
+                total = $df_var["$metric"].sum()
+                st.metric("$label", f"{total:,.2f}")
+''')
+
+_TAB_FOOTER_TMPL = string.Template('''
+            # Editor de datos
+            st.divider()
+            editable_cols = $editable_repr
+
+            edited_df = st.data_editor(
+                $df_var,
+                disabled=[c for c in $df_var.columns if c not in editable_cols],
+                key="$editor_key",
+                num_rows="dynamic",
+            )
+
+            # Boton guardar
+            if st.button("Guardar cambios", key="$save_key"):
+                updates = guardar_cambios_df(
+                    tabla="$table_name",
+                    pk_col="$pk",
+                    df_original=$df_var,
+                    df_editado=edited_df,
+                    columnas_editables=editable_cols,
+                )
+                if updates > 0:
+                    st.success(f"{updates} registros actualizados")
+                    st.rerun()
+''')
+
+_DATA_EDITOR_TMPL = string.Template('''
+# === Data Editor: $table_name ===
+df = fetch_rows(supabase, "$table_name", {"ID_DocumentoCargado": doc_id_sel})
+df = pd.DataFrame(df)
+
+if df.empty:
+    st.info("Sin datos")
+else:
+    editable_cols = $editable_repr
+    disabled_cols = [c for c in df.columns if c not in editable_cols]
+
+    edited_df = st.data_editor(
+        df,
+        disabled=disabled_cols,
+        key="$editor_key",
+        num_rows="fixed",
+        use_container_width=True,
+    )
+
+    if st.button("Guardar cambios", key="$save_key"):
+        updates = guardar_cambios_df(
+            tabla="$table_name",
+            pk_col="$pk",
+            df_original=df,
+            df_editado=edited_df,
+            columnas_editables=editable_cols,
+        )
+        st.success(f"{updates} registros actualizados")
+        st.rerun()
+''')
+
+_DELETE_UI_TMPL = string.Template('''
+# === Delete UI: $table_name ===
+st.divider()
+with st.expander("Eliminar registros"):
+    df_del = df[$delete_cols_repr].copy()
+    df_del["Eliminar"] = False
+
+    select_all = st.checkbox("Seleccionar todos", key="$select_all_key")
+    if select_all:
+        df_del["Eliminar"] = True
+
+    edited_del = st.data_editor(
+        df_del,
+        disabled=$display_repr,
+        key="$editor_key",
+    )
+
+    confirm = st.checkbox("Confirmo eliminar los registros seleccionados")
+
+    if st.button("Eliminar", key="$delete_key"):
+        if not confirm:
+            st.error("Debes confirmar antes de eliminar")
+        else:
+            ids_to_delete = edited_del.loc[
+                edited_del["Eliminar"] == True, "$pk"
+            ].tolist()
+
+            if ids_to_delete:
+                deleted = delete_rows(supabase, "$table_name", "$pk", ids_to_delete)
+                st.success(f"{deleted} registros eliminados")
+                st.rerun()
+            else:
+                st.warning("No hay registros seleccionados")
+''')
+
+_FORM_HEADER_TMPL = string.Template('''
+# === Formulario: $form_name ===
+with st.form("form_$form_name"):
+    st.subheader("Nuevo registro")
+''')
+
+_FORM_SUBMIT_TMPL = string.Template('''
+    submitted = st.form_submit_button("Guardar")
+
+    if submitted:
+        # Validar campos requeridos
+        if not $first_field:
+            st.error("Completa los campos requeridos")
+        else:
+            data = {
+''')
+
+_FORM_FOOTER = '''            }
+            # Insertar en BD
+            try:
+                supabase.table("tabla").insert(data).execute()
+                st.success("Registro creado exitosamente")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error: {e}")
+'''
+
+# Línea de código de cada tipo de campo de generate_form_boilerplate:
+# (name, label, field) -> str
+_FIELD_EMITTERS: Dict[str, Callable[[str, str, Dict[str, Any]], str]] = {
+    "text": lambda name, label, field: f'    {name} = st.text_input("{label}")\n',
+    "number": lambda name, label, field: (
+        f'    {name} = st.number_input("{label}", min_value=0.0, step=1.0)\n'
+    ),
+    "select": lambda name, label, field: (
+        f'    {name} = st.selectbox("{label}", {field.get("options", [])})\n'
+    ),
+    "textarea": lambda name, label, field: f'    {name} = st.text_area("{label}")\n',
+}
+
+# Marca de clave ausente en validate_session_state (None es un valor válido)
+_MISSING = object()
+
+# Huellas de session state distintas que recuerda validate_session_state
+VALIDATION_CACHE_SIZE = 64
+
+
+class _KeySpec(NamedTuple):
+    """Spec de una clave de session state (forma compacta de EXPECTED_SESSION_KEYS)."""
+    key: str
+    type_: str
+    required: bool
+    description: str
+
+
+class _TableCfg(NamedTuple):
+    """
+    Entrada de TABLE_UI_CONFIGS normalizada: defaults aplicados, tuplas, y
+    los repr de las listas que se insertan en el código generado ya armados.
+    """
+    pk: str
+    display: tuple
+    editable: tuple
+    metrics: tuple
+    metrics_top3: tuple  # ((columna, etiqueta), ...) de las métricas del tab
+    display_repr: str
+    editable_repr: str
+    delete_cols_repr: str  # display + [pk], columnas de la UI de eliminación
+    editable_set: frozenset  # para validate_data_editor_config
+
+
+def _table_cfg(config: Dict[str, Any]) -> _TableCfg:
+    """Normaliza una configuración de tabla de TABLE_UI_CONFIGS."""
+    pk = config.get("pk", "ID")
+    display = list(config.get("display", []))
+    editable = list(config.get("editable", []))
+    metrics = tuple(config.get("metrics", []))
+    return _TableCfg(
+        pk=pk,
+        display=tuple(display),
+        editable=tuple(editable),
+        metrics=metrics,
+        metrics_top3=tuple((m, m.replace("_", " ")) for m in metrics[:3]),
+        display_repr=repr(display),
+        editable_repr=repr(editable),
+        delete_cols_repr=repr(display + [pk]),
+        editable_set=frozenset(editable),
+    )
+
+
+# Configuración para tablas sin entrada en TABLE_UI_CONFIGS
+_EMPTY_CFG = _table_cfg({})
+
+
+@dataclass(slots=True, frozen=True)
 class SessionStateIssue:
     """Issue encontrado en session state."""
     key: str
@@ -28,17 +270,88 @@ class SessionStateIssue:
     recommendation: str = ""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ComponentConfig:
     """Configuración de un componente UI."""
     component_type: str
     name: str
     table_name: Optional[str] = None
-    columns: List[str] = None
-    editable_columns: List[str] = None
+    columns: Tuple[str, ...] = ()
+    editable_columns: Tuple[str, ...] = ()
     pk_column: Optional[str] = None
 
 
+# Columnas de UI por tabla. StreamlitAgent.TABLE_UI_CONFIGS toma de acá las
+# tablas de TABLE_UI_CONFIG_NAMES (si falta alguna, falla al importar)
+_TABLE_UI_SPECS = {
+    "bd_recursos": {
+        "pk": "ID_Recurso",
+        "display": ["Rec_Nombre", "Rec_Tipo", "Rec_Categoria"],
+        "editable": [
+            "Rec_Nombre", "Rec_Tipo", "Rec_Categoria",
+            "Rec_Vigente", "Rec_Devengado", "Rec_Percibido",
+            "Rec_Observacion",
+        ],
+        "metrics": ["Rec_Vigente", "Rec_Devengado", "Rec_Percibido"],
+    },
+    "bd_gastos": {
+        "pk": "ID_Gasto",
+        "display": ["Gasto_Objeto", "Gasto_Categoria"],
+        "editable": [
+            "Gasto_Objeto", "Gasto_Categoria",
+            "Gasto_Vigente", "Gasto_Preventivo", "Gasto_Compromiso",
+            "Gasto_Devengado", "Gasto_Pagado",
+        ],
+        "metrics": ["Gasto_Vigente", "Gasto_Devengado", "Gasto_Pagado"],
+    },
+    "bd_jurisdiccion": {
+        "pk": "ID_Jurisdiccion",
+        "display": ["Juri_Codigo", "Juri_Nombre"],
+        "editable": ["Juri_Codigo", "Juri_Nombre", "Juri_Descripcion"],
+        "metrics": [],
+    },
+    "bd_programas": {
+        "pk": "ID_Programa",
+        "display": ["Prog_Codigo", "Prog_Nombre"],
+        "editable": [
+            "Prog_Codigo", "Prog_Nombre",
+            "Prog_Vigente", "Prog_Preventivo", "Prog_Compromiso",
+            "Prog_Devengado", "Prog_Pagado",
+        ],
+        "metrics": ["Prog_Vigente", "Prog_Devengado", "Prog_Pagado"],
+    },
+    "bd_situacionpatrimonial": {
+        "pk": "ID_SituacionPatrimonial",
+        "display": ["SitPat_Tipo", "SitPat_Nombre"],
+        "editable": [
+            "SitPat_Tipo", "SitPat_Codigo", "SitPat_Nombre", "SitPat_Saldo",
+        ],
+        "metrics": ["SitPat_Saldo"],
+    },
+    "bd_movimientosTesoreria": {
+        "pk": "ID_MovimientoTesoreria",
+        "display": ["MovTes_TipoResumido", "MovTes_Tipo"],
+        "editable": ["MovTes_TipoResumido", "MovTes_Tipo", "MovTes_Importe"],
+        "metrics": ["MovTes_Importe"],
+    },
+    "bd_cuentas": {
+        "pk": "ID_Cuenta",
+        "display": ["Cuenta_Codigo", "Cuenta_Nombre"],
+        "editable": ["Cuenta_Codigo", "Cuenta_Nombre", "Cuenta_Importe"],
+        "metrics": ["Cuenta_Importe"],
+    },
+    "bd_metas": {
+        "pk": "ID_Meta",
+        "display": ["Meta_Nombre", "Meta_Unidad"],
+        "editable": [
+            "Meta_Nombre", "Meta_Unidad",
+            "Meta_Anual", "Meta_Parcial", "Meta_Ejecutado",
+        ],
+        "metrics": ["Meta_Anual", "Meta_Ejecutado"],
+    },
+}
+
+
 class StreamlitAgent(BaseAgent):
     """Agente para desarrollo de UI Streamlit."""
 
@@ -70,75 +383,15 @@ class StreamlitAgent(BaseAgent):
             "description": "Nombre del documento seleccionado",
         },
     }
+    _EXPECTED_VIEW = MappingProxyType(EXPECTED_SESSION_KEYS)
+    _SESSION_SPECS = tuple(
+        _KeySpec(key, spec["type"], spec["required"], spec["description"])
+        for key, spec in EXPECTED_SESSION_KEYS.items()
+    )
 
-    # Configuraciones de tablas para UI
-    TABLE_UI_CONFIGS = {
-        "bd_recursos": {
-            "pk": "ID_Recurso",
-            "display": ["Rec_Nombre", "Rec_Tipo", "Rec_Categoria"],
-            "editable": [
-                "Rec_Nombre", "Rec_Tipo", "Rec_Categoria",
-                "Rec_Vigente", "Rec_Devengado", "Rec_Percibido",
-                "Rec_Observacion",
-            ],
-            "metrics": ["Rec_Vigente", "Rec_Devengado", "Rec_Percibido"],
-        },
-        "bd_gastos": {
-            "pk": "ID_Gasto",
-            "display": ["Gasto_Objeto", "Gasto_Categoria"],
-            "editable": [
-                "Gasto_Objeto", "Gasto_Categoria",
-                "Gasto_Vigente", "Gasto_Preventivo", "Gasto_Compromiso",
-                "Gasto_Devengado", "Gasto_Pagado",
-            ],
-            "metrics": ["Gasto_Vigente", "Gasto_Devengado", "Gasto_Pagado"],
-        },
-        "bd_jurisdiccion": {
-            "pk": "ID_Jurisdiccion",
-            "display": ["Juri_Codigo", "Juri_Nombre"],
-            "editable": ["Juri_Codigo", "Juri_Nombre", "Juri_Descripcion"],
-            "metrics": [],
-        },
-        "bd_programas": {
-            "pk": "ID_Programa",
-            "display": ["Prog_Codigo", "Prog_Nombre"],
-            "editable": [
-                "Prog_Codigo", "Prog_Nombre",
-                "Prog_Vigente", "Prog_Preventivo", "Prog_Compromiso",
-                "Prog_Devengado", "Prog_Pagado",
-            ],
-            "metrics": ["Prog_Vigente", "Prog_Devengado", "Prog_Pagado"],
-        },
-        "bd_situacionpatrimonial": {
-            "pk": "ID_SituacionPatrimonial",
-            "display": ["SitPat_Tipo", "SitPat_Nombre"],
-            "editable": [
-                "SitPat_Tipo", "SitPat_Codigo", "SitPat_Nombre", "SitPat_Saldo",
-            ],
-            "metrics": ["SitPat_Saldo"],
-        },
-        "bd_movimientosTesoreria": {
-            "pk": "ID_MovimientoTesoreria",
-            "display": ["MovTes_TipoResumido", "MovTes_Tipo"],
-            "editable": ["MovTes_TipoResumido", "MovTes_Tipo", "MovTes_Importe"],
-            "metrics": ["MovTes_Importe"],
-        },
-        "bd_cuentas": {
-            "pk": "ID_Cuenta",
-            "display": ["Cuenta_Codigo", "Cuenta_Nombre"],
-            "editable": ["Cuenta_Codigo", "Cuenta_Nombre", "Cuenta_Importe"],
-            "metrics": ["Cuenta_Importe"],
-        },
-        "bd_metas": {
-            "pk": "ID_Meta",
-            "display": ["Meta_Nombre", "Meta_Unidad"],
-            "editable": [
-                "Meta_Nombre", "Meta_Unidad",
-                "Meta_Anual", "Meta_Parcial", "Meta_Ejecutado",
-            ],
-            "metrics": ["Meta_Anual", "Meta_Ejecutado"],
-        },
-    }
+    # Configuraciones de tablas para UI, en el orden de TABLE_UI_CONFIG_NAMES:
+    # la lista de tablas se define solo en agents/_tables.py
+    TABLE_UI_CONFIGS = {name: _TABLE_UI_SPECS[name] for name in TABLE_UI_CONFIG_NAMES}
 
     def __init__(self, config: AgentConfig = None, verbose: bool = False):
         """
@@ -150,6 +403,8 @@ class StreamlitAgent(BaseAgent):
         """
         super().__init__(name="streamlit", verbose=verbose)
         self.config = config or AgentConfig()
+        # Resultados de validate_session_state por huella del estado
+        self._validation_cache: "OrderedDict[tuple, List[SessionStateIssue]]" = OrderedDict()
 
     def health_check(self) -> Dict[str, Any]:
         """
@@ -182,28 +437,49 @@ class StreamlitAgent(BaseAgent):
         Returns:
             Lista de issues encontrados
         """
+        # Streamlit re-valida el mismo estado en cada rerun: el resultado solo
+        # depende de qué claves hay, sus tipos y si doc/municipio están cargados
+        values = [session_state.get(spec.key, _MISSING) for spec in self._SESSION_SPECS]
+        fingerprint = tuple(
+            None if value is _MISSING else type(value) for value in values
+        ) + (
+            bool(session_state.get("documento_seleccionado_id")),
+            bool(session_state.get("municipio_seleccionado_id")),
+        )
+        cached = self._validation_cache.get(fingerprint)
+        if cached is not None:
+            self._validation_cache.move_to_end(fingerprint)
+            return list(cached)
+
         issues = []
 
-        for key, spec in self.EXPECTED_SESSION_KEYS.items():
-            if key not in session_state:
-                if spec["required"]:
+        for spec, value in zip(self._SESSION_SPECS, values):
+            key = spec.key
+            if value is _MISSING:
+                if spec.required:
                     issues.append(SessionStateIssue(
                         key=key,
                         issue_type="missing",
-                        expected_type=spec["type"],
+                        expected_type=spec.type_,
                         recommendation=f"Inicializar '{key}' en session_state",
                     ))
-            else:
-                value = session_state[key]
-                # Verificar tipo básico
-                if spec["type"] == "str" and not isinstance(value, (str, type(None))):
-                    issues.append(SessionStateIssue(
-                        key=key,
-                        issue_type="type_mismatch",
-                        expected_type="str",
-                        actual_type=type(value).__name__,
-                        recommendation=f"'{key}' deberia ser str",
-                    ))
+                continue
+
+            # Verificar tipo básico (str exacto primero; subclases de str
+            # siguen siendo válidas)
+            if (
+                spec.type_ == "str"
+                and value is not None
+                and type(value) is not str
+                and not isinstance(value, str)
+            ):
+                issues.append(SessionStateIssue(
+                    key=key,
+                    issue_type="type_mismatch",
+                    expected_type="str",
+                    actual_type=type(value).__name__,
+                    recommendation=f"'{key}' deberia ser str",
+                ))
 
         # Verificar consistencia
         if session_state.get("documento_seleccionado_id"):
@@ -214,11 +490,14 @@ class StreamlitAgent(BaseAgent):
                     recommendation="Documento seleccionado sin municipio",
                 ))
 
-        return issues
+        self._validation_cache[fingerprint] = issues
+        if len(self._validation_cache) > VALIDATION_CACHE_SIZE:
+            self._validation_cache.popitem(last=False)
+        return list(issues)
 
-    def get_expected_session_keys(self) -> Dict[str, Dict]:
-        """Retorna estructura esperada de session state."""
-        return self.EXPECTED_SESSION_KEYS.copy()
+    def get_expected_session_keys(self) -> Mapping[str, Dict]:
+        """Retorna estructura esperada de session state (vista de solo lectura)."""
+        return self._EXPECTED_VIEW
 
     def generate_mock_session_state(self, logged_in: bool = True) -> Dict[str, Any]:
         """
@@ -234,16 +513,16 @@ class StreamlitAgent(BaseAgent):
 
         if logged_in:
             state["user"] = {
-                "id": str(uuid.uuid4()),
+                "id": _mock_id(),
                 "email": "test@ejemplo.com",
                 "aud": "authenticated",
             }
         else:
             state["user"] = None
 
-        state["municipio_seleccionado_id"] = str(uuid.uuid4())
+        state["municipio_seleccionado_id"] = _mock_id()
         state["municipio_seleccionado_nombre"] = "Municipio de Prueba"
-        state["documento_seleccionado_id"] = str(uuid.uuid4())
+        state["documento_seleccionado_id"] = _mock_id()
         state["documento_seleccionado_nombre"] = "SITECO Q1 2025"
 
         return state
@@ -265,63 +544,7 @@ class StreamlitAgent(BaseAgent):
         Returns:
             Código Python como string
         """
-        config = self.TABLE_UI_CONFIGS.get(table_name, {})
-        pk = config.get("pk", "ID")
-        editable = config.get("editable", [])
-        metrics = config.get("metrics", [])
-
-        code = f'''
-# === Tab: {tab_name} ===
-with tab_{tab_name.lower()}:
-    st.subheader("{tab_name}")
-
-    # Verificar documento seleccionado
-    if not doc_id_sel:
-        st.warning("Selecciona un documento primero")
-    else:
-        # Fetch data
-        df_{tab_name.lower()} = fetch_data_{tab_name.lower()}(supabase, doc_id_sel)
-
-        if df_{tab_name.lower()}.empty:
-            st.info("Sin datos cargados para este documento")
-        else:
-            # Mostrar metricas
-            cols_metrics = st.columns({len(metrics) if metrics else 3})
-'''
-
-        # Agregar métricas
-        for i, metric in enumerate(metrics[:3]):
-            code += f'''            with cols_metrics[{i}]:
-                total = df_{tab_name.lower()}["{metric}"].sum()
-                st.metric("{metric.replace('_', ' ')}", f"{{total:,.2f}}")
-'''
-
-        code += f'''
-            # Editor de datos
-            st.divider()
-            editable_cols = {editable}
-
-            edited_df = st.data_editor(
-                df_{tab_name.lower()},
-                disabled=[c for c in df_{tab_name.lower()}.columns if c not in editable_cols],
-                key="editor_{tab_name.lower()}",
-                num_rows="dynamic",
-            )
-
-            # Boton guardar
-            if st.button("Guardar cambios", key="save_{tab_name.lower()}"):
-                updates = guardar_cambios_df(
-                    tabla="{table_name}",
-                    pk_col="{pk}",
-                    df_original=df_{tab_name.lower()},
-                    df_editado=edited_df,
-                    columnas_editables=editable_cols,
-                )
-                if updates > 0:
-                    st.success(f"{{updates}} registros actualizados")
-                    st.rerun()
-'''
-        return code
+        return _gen_tab(tab_name, table_name)
 
     def generate_form_boilerplate(
         self,
@@ -338,52 +561,25 @@ with tab_{tab_name.lower()}:
         Returns:
             Código Python
         """
-        code = f'''
-# === Formulario: {form_name} ===
-with st.form("form_{form_name}"):
-    st.subheader("Nuevo registro")
-'''
+        parts = [_FORM_HEADER_TMPL.substitute(form_name=form_name)]
+        names = []
 
         for field in fields:
             name = field.get("name", "campo")
             ftype = field.get("type", "text")
             label = field.get("label", name)
+            names.append(name)
 
-            if ftype == "text":
-                code += f'    {name} = st.text_input("{label}")\n'
-            elif ftype == "number":
-                code += f'    {name} = st.number_input("{label}", min_value=0.0, step=1.0)\n'
-            elif ftype == "select":
-                options = field.get("options", [])
-                code += f'    {name} = st.selectbox("{label}", {options})\n'
-            elif ftype == "textarea":
-                code += f'    {name} = st.text_area("{label}")\n'
-
-        code += f'''
-    submitted = st.form_submit_button("Guardar")
+            emit = _FIELD_EMITTERS.get(ftype)
+            if emit is not None:  # tipos desconocidos no generan nada
+                parts.append(emit(name, label, field))
 
-    if submitted:
-        # Validar campos requeridos
-        if not {fields[0]["name"] if fields else "campo"}:
-            st.error("Completa los campos requeridos")
-        else:
-            data = {{
-'''
-
-        for field in fields:
-            name = field.get("name", "campo")
-            code += f'                "{name}": {name},\n'
-
-        code += f'''            }}
-            # Insertar en BD
-            try:
-                supabase.table("tabla").insert(data).execute()
-                st.success("Registro creado exitosamente")
-                st.rerun()
-            except Exception as e:
-                st.error(f"Error: {{e}}")
-'''
-        return code
+        parts.append(_FORM_SUBMIT_TMPL.substitute(
+            first_field=fields[0]["name"] if fields else "campo",
+        ))
+        parts.extend(f'                "{name}": {name},\n' for name in names)
+        parts.append(_FORM_FOOTER)
+        return "".join(parts)
 
     def generate_data_editor_boilerplate(self, table_name: str) -> str:
         """
@@ -395,40 +591,7 @@ with st.form("form_{form_name}"):
         Returns:
             Código Python
         """
-        config = self.TABLE_UI_CONFIGS.get(table_name, {})
-        pk = config.get("pk", "ID")
-        editable = config.get("editable", [])
-
-        return f'''
-# === Data Editor: {table_name} ===
-df = fetch_rows(supabase, "{table_name}", {{"ID_DocumentoCargado": doc_id_sel}})
-df = pd.DataFrame(df)
-
-if df.empty:
-    st.info("Sin datos")
-else:
-    editable_cols = {editable}
-    disabled_cols = [c for c in df.columns if c not in editable_cols]
-
-    edited_df = st.data_editor(
-        df,
-        disabled=disabled_cols,
-        key="editor_{table_name}",
-        num_rows="fixed",
-        use_container_width=True,
-    )
-
-    if st.button("Guardar cambios", key="save_{table_name}"):
-        updates = guardar_cambios_df(
-            tabla="{table_name}",
-            pk_col="{pk}",
-            df_original=df,
-            df_editado=edited_df,
-            columnas_editables=editable_cols,
-        )
-        st.success(f"{{updates}} registros actualizados")
-        st.rerun()
-'''
+        return _gen_data_editor(table_name)
 
     def generate_delete_ui_boilerplate(self, table_name: str) -> str:
         """
@@ -440,44 +603,7 @@ else:
         Returns:
             Código Python
         """
-        config = self.TABLE_UI_CONFIGS.get(table_name, {})
-        pk = config.get("pk", "ID")
-        display = config.get("display", [])
-
-        return f'''
-# === Delete UI: {table_name} ===
-st.divider()
-with st.expander("Eliminar registros"):
-    df_del = df[{display + [pk]}].copy()
-    df_del["Eliminar"] = False
-
-    select_all = st.checkbox("Seleccionar todos", key="select_all_{table_name}")
-    if select_all:
-        df_del["Eliminar"] = True
-
-    edited_del = st.data_editor(
-        df_del,
-        disabled={display},
-        key="delete_editor_{table_name}",
-    )
-
-    confirm = st.checkbox("Confirmo eliminar los registros seleccionados")
-
-    if st.button("Eliminar", key="delete_{table_name}"):
-        if not confirm:
-            st.error("Debes confirmar antes de eliminar")
-        else:
-            ids_to_delete = edited_del.loc[
-                edited_del["Eliminar"] == True, "{pk}"
-            ].tolist()
-
-            if ids_to_delete:
-                deleted = delete_rows(supabase, "{table_name}", "{pk}", ids_to_delete)
-                st.success(f"{{deleted}} registros eliminados")
-                st.rerun()
-            else:
-                st.warning("No hay registros seleccionados")
-'''
+        return _gen_delete_ui(table_name)
 
     def generate_full_crud_tab(self, table_name: str, tab_name: str = None) -> str:
         """
@@ -492,22 +618,15 @@ with st.expander("Eliminar registros"):
         """
         if tab_name is None:
             tab_name = table_name.replace("bd_", "").title()
-
-        code = self.generate_tab_boilerplate(tab_name, table_name)
-        code += "\n" + self.generate_delete_ui_boilerplate(table_name)
-        return code
+        return _gen_full_crud(table_name, tab_name)
 
     # === Mock Data Generation ===
 
     def generate_mock_municipio(self) -> Dict[str, Any]:
         """Genera datos mock de municipio."""
-        nombres = [
-            "San Isidro", "Tigre", "Vicente Lopez", "La Plata",
-            "Quilmes", "Lomas de Zamora", "Avellaneda", "Moron",
-        ]
         return {
-            "ID_Municipio": str(uuid.uuid4()),
-            "Muni_Nombre": random.choice(nombres),
+            "ID_Municipio": _mock_id(),
+            "Muni_Nombre": random.choice(_NOMBRES_MUNI),
             "Muni_Poblacion_2022": random.randint(50000, 500000),
             "Muni_Superficie": round(random.uniform(20, 200), 2),
             "Muni_Densidad": round(random.uniform(500, 10000), 2),
@@ -515,18 +634,14 @@ with st.expander("Eliminar registros"):
 
     def generate_mock_document(self, muni_id: str = None) -> Dict[str, Any]:
         """Genera datos mock de documento."""
-        tipos = ["Rendicion", "Presupuesto"]
-        periodos = ["Q1", "Q2", "Q3", "Q4", "Anual"]
-        estados = ["Pendiente", "Procesando", "Procesado", "Error"]
-
         return {
-            "ID_DocumentoCargado": str(uuid.uuid4()),
-            "ID_Municipio": muni_id or str(uuid.uuid4()),
-            "Doc_Tipo": random.choice(tipos),
-            "Doc_Periodo": random.choice(periodos),
+            "ID_DocumentoCargado": _mock_id(),
+            "ID_Municipio": muni_id or _mock_id(),
+            "Doc_Tipo": random.choice(_DOC_TIPOS),
+            "Doc_Periodo": random.choice(_PERIODOS),
             "Doc_Anio": random.randint(2020, 2025),
-            "Doc_Nombre": f"SITECO {random.choice(periodos)} {random.randint(2020, 2025)}",
-            "Doc_Estado": random.choice(estados),
+            "Doc_Nombre": f"SITECO {random.choice(_PERIODOS)} {random.randint(2020, 2025)}",
+            "Doc_Estado": random.choice(_ESTADOS),
         }
 
     def generate_mock_table_data(
@@ -546,57 +661,84 @@ with st.expander("Eliminar registros"):
         Returns:
             Lista de registros mock
         """
-        config = self.TABLE_UI_CONFIGS.get(table_name, {})
-        pk = config.get("pk", "ID")
+        cfg = _TABLE_CFG.get(table_name, _EMPTY_CFG)
+        pk = cfg.pk
+        count = max(count, 0)  # range() daba [] con negativos; numpy falla
+        n = range(1, count + 1)
+
+        # Las columnas se generan enteras (numpy en bloque si está) y
+        # después se arman las filas.
+        np = _numpy()
+        if np is not None:
+            rng = np.random.default_rng()
+
+            def amounts(low, high):
+                return np.round(rng.uniform(low, high, size=count), 2).tolist()
+
+            def choices(options):
+                return [options[j] for j in rng.integers(len(options), size=count).tolist()]
+        else:
+            def amounts(low, high):
+                return [round(random.uniform(low, high), 2) for _ in n]
+
+            def choices(options):
+                return [random.choice(options) for _ in n]
+
+        # Generar valores según tabla
+        if table_name == "bd_recursos":
+            columns = {
+                "Rec_Nombre": [f"Recurso {i}" for i in n],
+                "Rec_Tipo": choices(("Presupuestarios", "Extrapresupuestarios")),
+                "Rec_Categoria": choices(("Corrientes", "De Capital")),
+                "Rec_Vigente": amounts(100000, 5000000),
+                "Rec_Devengado": amounts(80000, 4000000),
+                "Rec_Percibido": amounts(60000, 3500000),
+            }
+        elif table_name == "bd_gastos":
+            columns = {
+                "Gasto_Objeto": [f"{i} - Gasto tipo {i}" for i in n],
+                "Gasto_Categoria": choices(("Corriente", "De Capital")),
+                "Gasto_Vigente": amounts(100000, 5000000),
+                "Gasto_Preventivo": amounts(90000, 4500000),
+                "Gasto_Compromiso": amounts(80000, 4000000),
+                "Gasto_Devengado": amounts(70000, 3500000),
+                "Gasto_Pagado": amounts(50000, 3000000),
+            }
+        elif table_name == "bd_jurisdiccion":
+            columns = {
+                "Juri_Codigo": [f"{i:02d}" for i in n],
+                "Juri_Nombre": [f"Jurisdiccion {i}" for i in n],
+            }
+        elif table_name == "bd_programas":
+            columns = {
+                "Prog_Codigo": [f"{i:02d}" for i in n],
+                "Prog_Nombre": [f"Programa {i}" for i in n],
+                "Prog_Vigente": amounts(50000, 2000000),
+                "Prog_Devengado": amounts(40000, 1800000),
+            }
+        else:
+            # Genérico
+            columns = {}
+            for col in cfg.editable:
+                col_l = col.lower()
+                if "importe" in col_l or "saldo" in col_l:
+                    columns[col] = amounts(10000, 500000)
+                elif "codigo" in col_l:
+                    columns[col] = [f"{i:02d}" for i in n]
+                elif "nombre" in col_l:
+                    columns[col] = [f"Item {i}" for i in n]
+
+        ids = [_mock_id() for _ in n]
 
         rows = []
         for i in range(count):
-            row = {pk: str(uuid.uuid4())}
+            row = {pk: ids[i]}
 
             if doc_id:
                 row["ID_DocumentoCargado"] = doc_id
 
-            # Generar valores según tabla
-            if table_name == "bd_recursos":
-                row.update({
-                    "Rec_Nombre": f"Recurso {i+1}",
-                    "Rec_Tipo": random.choice(["Presupuestarios", "Extrapresupuestarios"]),
-                    "Rec_Categoria": random.choice(["Corrientes", "De Capital"]),
-                    "Rec_Vigente": round(random.uniform(100000, 5000000), 2),
-                    "Rec_Devengado": round(random.uniform(80000, 4000000), 2),
-                    "Rec_Percibido": round(random.uniform(60000, 3500000), 2),
-                })
-            elif table_name == "bd_gastos":
-                row.update({
-                    "Gasto_Objeto": f"{i+1} - Gasto tipo {i+1}",
-                    "Gasto_Categoria": random.choice(["Corriente", "De Capital"]),
-                    "Gasto_Vigente": round(random.uniform(100000, 5000000), 2),
-                    "Gasto_Preventivo": round(random.uniform(90000, 4500000), 2),
-                    "Gasto_Compromiso": round(random.uniform(80000, 4000000), 2),
-                    "Gasto_Devengado": round(random.uniform(70000, 3500000), 2),
-                    "Gasto_Pagado": round(random.uniform(50000, 3000000), 2),
-                })
-            elif table_name == "bd_jurisdiccion":
-                row.update({
-                    "Juri_Codigo": f"{i+1:02d}",
-                    "Juri_Nombre": f"Jurisdiccion {i+1}",
-                })
-            elif table_name == "bd_programas":
-                row.update({
-                    "Prog_Codigo": f"{i+1:02d}",
-                    "Prog_Nombre": f"Programa {i+1}",
-                    "Prog_Vigente": round(random.uniform(50000, 2000000), 2),
-                    "Prog_Devengado": round(random.uniform(40000, 1800000), 2),
-                })
-            else:
-                # Genérico
-                for col in config.get("editable", []):
-                    if "importe" in col.lower() or "saldo" in col.lower():
-                        row[col] = round(random.uniform(10000, 500000), 2)
-                    elif "codigo" in col.lower():
-                        row[col] = f"{i+1:02d}"
-                    elif "nombre" in col.lower():
-                        row[col] = f"Item {i+1}"
+            for col, values in columns.items():
+                row[col] = values[i]
 
             rows.append(row)
 
@@ -621,27 +763,30 @@ with st.expander("Eliminar registros"):
         Returns:
             Lista de warnings/errors
         """
-        issues = []
-        config = self.TABLE_UI_CONFIGS.get(table_name)
+        cfg = _TABLE_CFG.get(table_name)
 
-        if not config:
-            issues.append(f"Tabla '{table_name}' no tiene configuracion UI")
-            return issues
+        if cfg is None:
+            return [f"Tabla '{table_name}' no tiene configuracion UI"]
 
-        pk = config.get("pk")
-        if pk in editable_columns:
-            issues.append(f"PK '{pk}' no deberia ser editable")
+        pk = cfg.pk
+        expected_editable = cfg.editable_set
+        actual_editable = frozenset(editable_columns)
 
-        expected_editable = set(config.get("editable", []))
-        actual_editable = set(editable_columns)
+        # Caso común: la configuración coincide, no hay nada que reportar
+        if actual_editable == expected_editable and pk not in actual_editable:
+            return []
+
+        issues = []
+        if pk in actual_editable:
+            issues.append(f"PK '{pk}' no deberia ser editable")
 
         missing = expected_editable - actual_editable - {pk}
         if missing:
-            issues.append(f"Columnas editables faltantes: {missing}")
+            issues.append(f"Columnas editables faltantes: {set(missing)}")
 
         extra = actual_editable - expected_editable
         if extra:
-            issues.append(f"Columnas extra marcadas editables: {extra}")
+            issues.append(f"Columnas extra marcadas editables: {set(extra)}")
 
         return issues
 
@@ -649,6 +794,83 @@ with st.expander("Eliminar registros"):
         """Obtiene configuración UI de una tabla."""
         return self.TABLE_UI_CONFIGS.get(table_name)
 
-    def list_available_tables(self) -> List[str]:
+    def list_available_tables(self) -> Tuple[str, ...]:
         """Lista tablas con configuración UI."""
-        return list(self.TABLE_UI_CONFIGS.keys())
+        return TABLE_UI_CONFIG_NAMES
+
+
+# TABLE_UI_CONFIGS normalizado una sola vez (ver _TableCfg)
+_TABLE_CFG: Dict[str, _TableCfg] = {
+    name: _table_cfg(config) for name, config in StreamlitAgent.TABLE_UI_CONFIGS.items()
+}
+
+# === Generación de código ===
+# El código generado depende solo de los argumentos y de _TABLE_CFG (fijo),
+# así que cada combinación se arma una vez y se reusa.
+
+@functools.lru_cache(maxsize=128)
+def _gen_tab(tab_name: str, table_name: str) -> str:
+    """Código de generate_tab_boilerplate."""
+    cfg = _TABLE_CFG.get(table_name, _EMPTY_CFG)
+    pk = cfg.pk
+    metrics = cfg.metrics
+
+    # Identificadores derivados del tab, armados una vez
+    tab_l = tab_name.lower()
+    df_var = f"df_{tab_l}"
+    editor_key = f"editor_{tab_l}"
+    save_key = f"save_{tab_l}"
+
+    cells = [
+        _METRIC_CELL_TMPL.substitute(
+            i=i, df_var=df_var, metric=metric, label=label,
+        )
+        for i, (metric, label) in enumerate(cfg.metrics_top3)
+    ]
+    return "".join((
+        _TAB_HEADER_TMPL.substitute(
+            tab_name=tab_name, tab_l=tab_l, df_var=df_var,
+            n_cols=len(metrics) if metrics else 3,
+        ),
+        *cells,
+        _TAB_FOOTER_TMPL.substitute(
+            df_var=df_var, editor_key=editor_key, save_key=save_key,
+            table_name=table_name, pk=pk, editable_repr=cfg.editable_repr,
+        ),
+    ))
+
+
+@functools.lru_cache(maxsize=128)
+def _gen_data_editor(table_name: str) -> str:
+    """Código de generate_data_editor_boilerplate."""
+    cfg = _TABLE_CFG.get(table_name, _EMPTY_CFG)
+    pk = cfg.pk
+    editor_key = f"editor_{table_name}"
+    save_key = f"save_{table_name}"
+
+    return _DATA_EDITOR_TMPL.substitute(
+        table_name=table_name, pk=pk, editable_repr=cfg.editable_repr,
+        editor_key=editor_key, save_key=save_key,
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def _gen_delete_ui(table_name: str) -> str:
+    """Código de generate_delete_ui_boilerplate."""
+    cfg = _TABLE_CFG.get(table_name, _EMPTY_CFG)
+    pk = cfg.pk
+    select_all_key = f"select_all_{table_name}"
+    editor_key = f"delete_editor_{table_name}"
+    delete_key = f"delete_{table_name}"
+
+    return _DELETE_UI_TMPL.substitute(
+        table_name=table_name, pk=pk,
+        delete_cols_repr=cfg.delete_cols_repr, display_repr=cfg.display_repr,
+        select_all_key=select_all_key, editor_key=editor_key, delete_key=delete_key,
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def _gen_full_crud(table_name: str, tab_name: str) -> str:
+    """Código de generate_full_crud_tab."""
+    return _gen_tab(tab_name, table_name) + "\n" + _gen_delete_ui(table_name)
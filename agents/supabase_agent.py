@@ -7,17 +7,59 @@ Funciones principales:
 - Diagnósticos de integridad
 - Búsqueda de registros huérfanos
 - Operaciones batch (limpieza, exports)
+
+Los diagnósticos pesados corren en Postgres vía funciones RPC definidas en
+agents/sql/supabase_agent.sql. Si una función no está instalada, el agente
+usa el camino en Python (traer filas y resolver acá) con el mismo resultado.
 """
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from enum import Enum
-import json
+import csv
+import io
+import operator
+import threading
+import time
 
+from . import _json
 from .base import BaseAgent
 from .config import AgentConfig
 
 
+# Código de error de PostgREST cuando la función RPC no existe
+_RPC_NOT_FOUND = "PGRST202"
+
+# Filas por request al recorrer tablas completas. No debe superar max-rows de
+# PostgREST (1000 por defecto en Supabase): un lote más corto marca el final.
+PAGE_SIZE = 1000
+
+# Requests concurrentes al recorrer varias tablas. Son llamadas HTTP que
+# pasan casi todo el tiempo esperando red (el GIL se libera), así que los
+# threads se solapan de verdad.
+IO_WORKERS = 8
+
+# IDs por DELETE ... in_(): van en la URL, y ~200 UUIDs (~7 KB) entran
+# holgados en los límites de largo de URL de los proxies delante de PostgREST
+DELETE_BATCH = 200
+
+# Segundos que se reusan los resúmenes (get_*_summary) antes de volver a
+# consultar; las operaciones que borran datos los invalidan
+SUMMARY_TTL = 60.0
+
+# Segundos que un health_check comparte su resultado: una ráfaga de llamadas
+# (varias sesiones del dashboard a la vez) hace un solo ping
+HEALTH_TTL = 2.0
+
+# Tablas con datos por documento (FK ID_DocumentoCargado)
+DOC_TABLES = (
+    "bd_recursos", "bd_gastos", "bd_jurisdiccion",
+    "bd_situacionpatrimonial", "bd_movimientosTesoreria", "bd_cuentas",
+)
+
+
 class DiagnosticType(Enum):
     """Tipos de diagnóstico disponibles."""
     ORPHAN_RECORDS = "orphan_records"
@@ -69,6 +111,17 @@ class SupabaseAgent(BaseAgent):
         self.config = config or AgentConfig.from_streamlit_secrets()
         self._client = supabase_client
         self._connected = False
+        # Funciones RPC que la base no tiene (no se reintentan)
+        self._missing_rpcs: set = set()
+        # Resúmenes recientes: {clave: (vence, valor)}, ver _cached_summary
+        self._summary_cache: Dict[tuple, tuple] = {}
+        # Un lock por tabla padre para no traer sus PKs dos veces en paralelo
+        self._parent_locks: Dict[str, threading.Lock] = {}
+        # False si PostgREST rechaza funciones de agregado (db-aggregates-enabled)
+        self._aggregates_ok = True
+        # health_check: (vence, resultado) y lock single-flight
+        self._health: Optional[tuple] = None
+        self._health_lock = threading.Lock()
 
     @property
     def client(self):
@@ -78,13 +131,123 @@ class SupabaseAgent(BaseAgent):
             self._connected = True
         return self._client
 
-    def health_check(self) -> Dict[str, Any]:
+    def _rpc(self, fn: str, params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Llama una función RPC de agents/sql/supabase_agent.sql.
+
+        Args:
+            fn: Nombre de la función
+            params: Argumentos de la función
+
+        Returns:
+            Filas devueltas, o None si la función no está instalada
+        """
+        if fn in self._missing_rpcs:
+            return None
+        try:
+            res = self.client.rpc(fn, params).execute()
+        except Exception as e:
+            if getattr(e, "code", None) != _RPC_NOT_FOUND:
+                raise
+            self.log_debug("RPC %s no instalada, usando camino en Python", fn)
+            self._missing_rpcs.add(fn)
+            return None
+        return getattr(res, "data", None) or []
+
+    def _cached_summary(self, key: tuple, compute: Callable[[], Any], use_cache: bool) -> Any:
+        """Resultado de compute(), reusado por SUMMARY_TTL segundos para la misma clave."""
+        now = time.monotonic()
+        if use_cache:
+            hit = self._summary_cache.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+        value = compute()
+        self._summary_cache[key] = (now + SUMMARY_TTL, value)
+        return value
+
+    def invalidate_summaries(self) -> None:
+        """Descarta los resúmenes cacheados (se llama tras borrar datos)."""
+        self._summary_cache.clear()
+
+    def _map_io(self, fn: Callable, items, max_workers: int) -> list:
+        """
+        Aplica fn a cada item, en paralelo con threads si max_workers > 1.
+
+        Returns:
+            Resultados en el orden de items
+        """
+        items = list(items)
+        if max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        _ = self.client  # crear el cliente antes de compartirlo entre threads
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+    def _iter_rows(
+        self,
+        table: str,
+        select: str,
+        pk: str,
+        filters: Optional[Dict[str, Any]] = None,
+        batch: int = PAGE_SIZE,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre una tabla completa en lotes, paginando por PK (keyset).
+
+        Un `.select().execute()` sin rango queda truncado en max-rows; acá
+        cada request pide los `batch` siguientes al último PK visto.
+
+        Args:
+            table: Nombre de la tabla
+            select: Columnas a traer (el PK se agrega si falta)
+            pk: Columna PK, usada para ordenar y paginar
+            filters: Filtros de igualdad (opcional)
+            batch: Filas por request
+
+        Yields:
+            Listas de filas, en orden de PK
+        """
+        if select != "*" and pk not in select.split(","):
+            select = f"{pk},{select}"
+
+        last_pk = None
+        while True:
+            query = self.client.table(table).select(select)
+            for key, value in (filters or {}).items():
+                query = query.eq(key, value)
+            if last_pk is not None:
+                query = query.gt(pk, last_pk)
+            res = query.order(pk).limit(batch).execute()
+            rows = getattr(res, "data", None) or []
+            if rows:
+                yield rows
+            if len(rows) < batch:
+                return
+            last_pk = rows[-1][pk]
+
+    def health_check(self, *, use_cache: bool = True) -> Dict[str, Any]:
         """
         Verifica la conexión a Supabase.
 
+        Las llamadas concurrentes esperan al ping en curso y todas las de los
+        siguientes HEALTH_TTL segundos reusan su resultado.
+
+        Args:
+            use_cache: Si False, hace un ping nuevo aunque haya uno reciente
+
         Returns:
             Dict con status de conexión
         """
+        with self._health_lock:
+            cached = self._health
+            if use_cache and cached is not None and cached[0] > time.monotonic():
+                return dict(cached[1])
+            result = self._ping()
+            self._health = (time.monotonic() + HEALTH_TTL, result)
+            return dict(result)
+
+    def _ping(self) -> Dict[str, Any]:
+        """Consulta mínima a Supabase, cronometrada (ver health_check)."""
         self.start_timer()
         try:
             # Intentar una consulta simple
@@ -109,12 +272,16 @@ class SupabaseAgent(BaseAgent):
 
     # === Inspección de Tablas ===
 
-    def inspect_table(self, table_name: str) -> TableInfo:
+    def inspect_table(self, table_name: str, exact: bool = False) -> TableInfo:
         """
         Obtiene información detallada de una tabla.
 
+        El conteo es estimado (estadísticas de Postgres) salvo exact=True,
+        que hace un count(*) completo de la tabla.
+
         Args:
             table_name: Nombre de la tabla
+            exact: Si True, cuenta exacto en vez de estimado
 
         Returns:
             TableInfo con detalles de la tabla
@@ -123,11 +290,13 @@ class SupabaseAgent(BaseAgent):
         if not table_config:
             raise ValueError(f"Tabla '{table_name}' no esta configurada")
 
-        # Contar registros
-        self.log_debug(f"Inspeccionando tabla: {table_name}")
+        # Contar registros (alcanza con el PK: no se traen filas)
+        self.log_debug("Inspeccionando tabla: %s", table_name)
         try:
-            res = self.client.table(table_name).select("*", count="exact").limit(0).execute()
-            row_count = res.count if hasattr(res, "count") else 0
+            res = self.client.table(table_name).select(
+                table_config["pk"], count="exact" if exact else "estimated"
+            ).limit(0).execute()
+            row_count = getattr(res, "count", None) or 0
         except Exception as e:
             self.log_warning(f"No se pudo contar registros en {table_name}: {e}")
             row_count = -1
@@ -140,37 +309,54 @@ class SupabaseAgent(BaseAgent):
             description=table_config.get("description", ""),
         )
 
-    def inspect_all_tables(self) -> List[TableInfo]:
+    def inspect_all_tables(
+        self,
+        exact: bool = False,
+        max_workers: int = IO_WORKERS,
+    ) -> List[TableInfo]:
         """
         Inspecciona todas las tablas del proyecto.
 
+        Args:
+            exact: Si True, conteos exactos (ver inspect_table)
+            max_workers: Tablas inspeccionadas en paralelo (1 = serie)
+
         Returns:
             Lista de TableInfo para cada tabla
         """
-        results = []
-        for table_name in self.config.get_all_tables():
+        def inspect(table_name: str) -> Optional[TableInfo]:
             try:
-                info = self.inspect_table(table_name)
-                results.append(info)
-                self.log_info(f"{table_name}: {info.row_count} registros")
+                info = self.inspect_table(table_name, exact=exact)
+                self.log_info("%s: %s registros", table_name, info.row_count)
+                return info
             except Exception as e:
                 self.log_error(f"Error inspeccionando {table_name}: {e}")
-        return results
+                return None
 
-    def get_table_summary(self) -> str:
+        infos = self._map_io(inspect, self.config.get_all_tables(), max_workers)
+        return [info for info in infos if info is not None]
+
+    def get_table_summary(self, exact: bool = False, *, use_cache: bool = True) -> str:
         """
         Genera un resumen de todas las tablas.
 
+        Args:
+            exact: Si True, conteos exactos (ver inspect_table)
+            use_cache: Si False, ignora un resumen de menos de SUMMARY_TTL s
+
         Returns:
             String con tabla formateada
         """
-        tables = self.inspect_all_tables()
-        headers = ["Tabla", "PK", "Registros", "Descripcion"]
-        rows = [
-            [t.name, t.pk_column, t.row_count, t.description[:30]]
-            for t in tables
-        ]
-        return self.format_table(headers, rows)
+        def build() -> str:
+            tables = self.inspect_all_tables(exact=exact)
+            headers = ["Tabla", "PK", "Registros", "Descripcion"]
+            rows = [
+                [t.name, t.pk_column, t.row_count, t.description[:30]]
+                for t in tables
+            ]
+            return self.format_table(headers, rows)
+
+        return self._cached_summary(("table_summary", exact), build, use_cache)
 
     # === Diagnósticos ===
 
@@ -179,6 +365,8 @@ class SupabaseAgent(BaseAgent):
         child_table: str,
         parent_table: str,
         fk_column: str,
+        *,
+        parent_id_cache: Optional[Dict[str, frozenset]] = None,
     ) -> DiagnosticResult:
         """
         Busca registros huérfanos (sin padre).
@@ -187,39 +375,45 @@ class SupabaseAgent(BaseAgent):
             child_table: Tabla hija
             parent_table: Tabla padre
             fk_column: Columna FK en la tabla hija
+            parent_id_cache: PKs de padres ya traídos ({tabla: frozenset}),
+                compartido entre tablas hijas del mismo padre
 
         Returns:
             DiagnosticResult con registros huérfanos
         """
-        self.log_debug(f"Buscando huerfanos: {child_table}.{fk_column} -> {parent_table}")
+        self.log_debug("Buscando huerfanos: %s.%s -> %s", child_table, fk_column, parent_table)
 
         parent_config = self.config.get_table_info(parent_table)
         if not parent_config:
             raise ValueError(f"Tabla padre '{parent_table}' no configurada")
 
         parent_pk = parent_config["pk"]
-
-        # Obtener todos los IDs del padre
-        parent_res = self.client.table(parent_table).select(parent_pk).execute()
-        parent_ids = set()
-        if hasattr(parent_res, "data") and parent_res.data:
-            parent_ids = {str(row[parent_pk]) for row in parent_res.data}
-
-        # Obtener registros de la tabla hija
         child_config = self.config.get_table_info(child_table)
         child_pk = child_config["pk"]
-        child_res = self.client.table(child_table).select(f"{child_pk},{fk_column}").execute()
 
-        orphans = []
-        if hasattr(child_res, "data") and child_res.data:
-            for row in child_res.data:
-                fk_value = row.get(fk_column)
-                if fk_value and str(fk_value) not in parent_ids:
-                    orphans.append({
-                        child_pk: row[child_pk],
-                        fk_column: fk_value,
-                    })
+        # Anti-join en Postgres: solo viajan los huérfanos
+        rows = self._rpc("find_orphans", {
+            "child_table": child_table,
+            "child_pk": child_pk,
+            "fk_col": fk_column,
+            "parent_table": parent_table,
+            "parent_pk": parent_pk,
+        })
+        if rows is not None:
+            orphans = [
+                {child_pk: row["child_id"], fk_column: row["fk_value"]}
+                for row in rows
+            ]
+        else:
+            orphans = self._find_orphans_client_side(
+                child_table, child_pk, fk_column, parent_table, parent_pk,
+                parent_id_cache,
+            )
+
+        return self._orphans_result(child_table, orphans)
 
+    def _orphans_result(self, child_table: str, orphans: List[Dict[str, Any]]) -> DiagnosticResult:
+        """DiagnosticResult de find_orphan_records a partir de los huérfanos."""
         severity = "error" if len(orphans) > 0 else "info"
         recommendation = (
             f"Eliminar {len(orphans)} registros huerfanos de {child_table}"
@@ -235,6 +429,99 @@ class SupabaseAgent(BaseAgent):
             count=len(orphans),
         )
 
+    def _find_orphans_client_side(
+        self,
+        child_table: str,
+        child_pk: str,
+        fk_column: str,
+        parent_table: str,
+        parent_pk: str,
+        parent_id_cache: Optional[Dict[str, frozenset]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Huérfanos recorriendo la tabla hija por lotes.
+
+        Si el padre es más grande que la hija, cada lote le pregunta a la RPC
+        missing_parents qué FKs no existen en el padre: el tráfico escala con
+        la hija. Si no (o sin la RPC), se traen una vez todos los IDs del
+        padre y se compara en Python.
+        """
+        parent_ids = None
+        if self._estimated_rows(parent_table) <= self._estimated_rows(child_table):
+            parent_ids = self._parent_ids(parent_table, parent_pk, parent_id_cache)
+
+        orphans = []
+        for rows in self._iter_rows(child_table, f"{child_pk},{fk_column}", child_pk):
+            candidates = {str(row[fk_column]) for row in rows if row.get(fk_column)}
+            if not candidates:
+                continue
+
+            missing = None
+            if parent_ids is None:
+                missing = self._rpc("missing_parents", {
+                    "parent_table": parent_table,
+                    "parent_pk": parent_pk,
+                    "candidates": list(candidates),
+                })
+            if missing is not None:
+                missing_ids = {row["value"] for row in missing}
+            else:
+                if parent_ids is None:
+                    parent_ids = self._parent_ids(parent_table, parent_pk, parent_id_cache)
+                missing_ids = candidates - parent_ids
+
+            if missing_ids:
+                for row in rows:
+                    fk_value = row.get(fk_column)
+                    if fk_value and str(fk_value) in missing_ids:
+                        orphans.append({
+                            child_pk: row[child_pk],
+                            fk_column: fk_value,
+                        })
+
+        return orphans
+
+    def _estimated_rows(self, table_name: str) -> int:
+        """Filas de la tabla según las estadísticas de Postgres (-1 si falla)."""
+        try:
+            pk = self.config.get_table_info(table_name)["pk"]
+            res = self.client.table(table_name).select(
+                pk, count="estimated"
+            ).limit(0).execute()
+            return getattr(res, "count", None) or 0
+        except Exception:
+            return -1
+
+    def _parent_ids(
+        self,
+        parent_table: str,
+        parent_pk: str,
+        cache: Optional[Dict[str, frozenset]] = None,
+    ) -> frozenset:
+        """PKs de la tabla padre; con cache, se traen una sola vez por padre."""
+        if cache is None:
+            return self._fetch_parent_ids(parent_table, parent_pk)
+        lock = self._parent_locks.setdefault(parent_table, threading.Lock())
+        with lock:
+            parent_ids = cache.get(parent_table)
+            if parent_ids is None:
+                parent_ids = cache[parent_table] = self._fetch_parent_ids(parent_table, parent_pk)
+        return parent_ids
+
+    def _fetch_parent_ids(self, parent_table: str, parent_pk: str) -> frozenset:
+        """Todos los PKs de la tabla padre, como str."""
+        parent_ids = set()
+        get_pk = operator.itemgetter(parent_pk)
+        for rows in self._iter_rows(parent_table, parent_pk, parent_pk):
+            if not rows:
+                continue
+            # UUIDs ya llegan como str: solo los PKs numéricos pasan por str()
+            if isinstance(rows[0][parent_pk], str):
+                parent_ids.update(map(get_pk, rows))
+            else:
+                parent_ids.update(map(str, map(get_pk, rows)))
+        return frozenset(parent_ids)
+
     def find_duplicates(
         self,
         table_name: str,
@@ -250,30 +537,21 @@ class SupabaseAgent(BaseAgent):
         Returns:
             DiagnosticResult con duplicados encontrados
         """
-        self.log_debug(f"Buscando duplicados en {table_name} por {columns}")
+        self.log_debug("Buscando duplicados en %s por %s", table_name, columns)
 
         table_config = self.config.get_table_info(table_name)
         pk = table_config["pk"]
 
-        # Obtener todos los registros
-        select_cols = f"{pk}," + ",".join(columns)
-        res = self.client.table(table_name).select(select_cols).execute()
-
-        # Buscar duplicados
-        seen = {}
-        duplicates = []
-
-        if hasattr(res, "data") and res.data:
-            for row in res.data:
-                key = tuple(str(row.get(col, "")) for col in columns)
-                if key in seen:
-                    duplicates.append({
-                        pk: row[pk],
-                        "duplicate_of": seen[key],
-                        "key": {col: row.get(col) for col in columns},
-                    })
-                else:
-                    seen[key] = row[pk]
+        # GROUP BY ... HAVING count(*) > 1 en Postgres: solo viajan los grupos
+        groups = self._rpc("find_dupes", {"tbl": table_name, "pk": pk, "cols": list(columns)})
+        if groups is not None:
+            duplicates = [
+                {pk: dup_id, "duplicate_of": group["ids"][0], "key": group["key"]}
+                for group in groups
+                for dup_id in group["ids"][1:]
+            ]
+        else:
+            duplicates = self._find_duplicates_client_side(table_name, pk, columns)
 
         severity = "warning" if len(duplicates) > 0 else "info"
         return DiagnosticResult(
@@ -285,32 +563,127 @@ class SupabaseAgent(BaseAgent):
             count=len(duplicates),
         )
 
-    def validate_data_integrity(self, table_name: str = None) -> List[DiagnosticResult]:
+    def _find_duplicates_client_side(
+        self,
+        table_name: str,
+        pk: str,
+        columns: List[str],
+    ) -> List[Dict[str, Any]]:
+        """Duplicados recorriendo la tabla y agrupando en Python."""
+        select_cols = f"{pk}," + ",".join(columns)
+        # Las filas traen todas las columnas del select: la clave sale de un
+        # itemgetter armado una vez (valor suelto si es una sola columna)
+        get_key = operator.itemgetter(*columns)
+        seen = {}
+        duplicates = []
+
+        for rows in self._iter_rows(table_name, select_cols, pk):
+            for row in rows:
+                row_pk = row[pk]
+                key = get_key(row)
+                try:
+                    first_pk = seen.setdefault(key, row_pk)
+                except TypeError:  # columnas json (dict/list) no son hasheables
+                    first_pk = seen.setdefault(repr(key), row_pk)
+                if first_pk != row_pk:
+                    duplicates.append({
+                        pk: row_pk,
+                        "duplicate_of": first_pk,
+                        "key": {col: row.get(col) for col in columns},
+                    })
+
+        return duplicates
+
+    def validate_data_integrity(
+        self,
+        table_name: str = None,
+        max_workers: int = IO_WORKERS,
+    ) -> List[DiagnosticResult]:
         """
         Valida integridad referencial.
 
         Args:
             table_name: Tabla específica o None para todas
+            max_workers: FKs verificadas en paralelo (1 = serie)
 
         Returns:
             Lista de DiagnosticResult
         """
-        results = []
         tables = [table_name] if table_name else self.config.get_all_tables()
 
+        # Cada FK de cada tabla es un chequeo independiente
+        checks = []
         for tbl in tables:
             table_config = self.config.get_table_info(tbl)
             if not table_config:
                 continue
-
-            # Verificar cada FK
             for fk_col, parent_tbl in table_config.get("fk", []):
-                try:
-                    result = self.find_orphan_records(tbl, parent_tbl, fk_col)
-                    results.append(result)
-                except Exception as e:
-                    self.log_error(f"Error validando {tbl}.{fk_col}: {e}")
+                checks.append((tbl, fk_col, parent_tbl))
+
+        # Con la RPC run_diagnostics todos los chequeos van en un request
+        results = self._integrity_via_rpc(checks)
+        if results is not None:
+            return results
+
+        # Varias tablas hijas suelen apuntar al mismo padre (bd_municipios,
+        # BD_DocumentosCargados): sus PKs se traen una vez para todas
+        parent_id_cache: Dict[str, frozenset] = {}
+
+        def check(item) -> Optional[DiagnosticResult]:
+            tbl, fk_col, parent_tbl = item
+            try:
+                return self.find_orphan_records(
+                    tbl, parent_tbl, fk_col, parent_id_cache=parent_id_cache,
+                )
+            except Exception as e:
+                self.log_error(f"Error validando {tbl}.{fk_col}: {e}")
+                return None
+
+        results = self._map_io(check, checks, max_workers)
+        return [result for result in results if result is not None]
+
+    def _integrity_via_rpc(self, checks: List[tuple]) -> Optional[List[DiagnosticResult]]:
+        """
+        Corre los chequeos (tabla, fk, padre) en Postgres con un solo request.
+
+        Returns:
+            Un DiagnosticResult por chequeo, o None si la RPC no está
+            disponible o falla (el llamador los corre uno por uno)
+        """
+        specs = []
+        for tbl, fk_col, parent_tbl in checks:
+            parent_config = self.config.get_table_info(parent_tbl)
+            if not parent_config:
+                self.log_error(
+                    f"Error validando {tbl}.{fk_col}: Tabla padre '{parent_tbl}' no configurada"
+                )
+                continue
+            specs.append({
+                "child_table": tbl,
+                "child_pk": self.config.get_table_info(tbl)["pk"],
+                "fk_col": fk_col,
+                "parent_table": parent_tbl,
+                "parent_pk": parent_config["pk"],
+            })
+        if not specs:
+            return []
+
+        try:
+            report = self._rpc("run_diagnostics", {"checks": specs})
+        except Exception as e:
+            self.log_warning(f"run_diagnostics fallo, verificando FK por FK: {e}")
+            return None
+        if report is None:
+            return None
 
+        results = []
+        for spec, entry in zip(specs, report):
+            child_pk, fk_col = spec["child_pk"], spec["fk_col"]
+            orphans = [
+                {child_pk: o["child_id"], fk_col: o["fk_value"]}
+                for o in entry["orphans"]
+            ]
+            results.append(self._orphans_result(spec["child_table"], orphans))
         return results
 
     def run_all_diagnostics(self) -> Dict[str, List[DiagnosticResult]]:
@@ -347,13 +720,22 @@ class SupabaseAgent(BaseAgent):
 
         return results
 
-    def get_diagnostics_summary(self) -> str:
+    def get_diagnostics_summary(self, *, use_cache: bool = True) -> str:
         """
         Genera resumen de diagnósticos.
 
+        Args:
+            use_cache: Si False, ignora un resumen de menos de SUMMARY_TTL s
+
         Returns:
             String formateado con resultados
         """
+        return self._cached_summary(
+            ("diagnostics_summary",), self._build_diagnostics_summary, use_cache,
+        )
+
+    def _build_diagnostics_summary(self) -> str:
+        """Corre run_all_diagnostics y arma el texto de get_diagnostics_summary."""
         diagnostics = self.run_all_diagnostics()
 
         lines = ["=== DIAGNOSTICOS DE BASE DE DATOS ===\n"]
@@ -382,17 +764,14 @@ class SupabaseAgent(BaseAgent):
             Dict con conteo por tabla
         """
         counts = {}
-        doc_tables = [
-            "bd_recursos", "bd_gastos", "bd_jurisdiccion",
-            "bd_situacionpatrimonial", "bd_movimientosTesoreria", "bd_cuentas",
-        ]
 
-        for table in doc_tables:
+        for table in DOC_TABLES:
+            pk = self.config.get_table_info(table)["pk"]
             try:
                 res = self.client.table(table).select(
-                    "*", count="exact"
+                    pk, count="exact"
                 ).eq("ID_DocumentoCargado", doc_id).limit(0).execute()
-                counts[table] = res.count if hasattr(res, "count") else 0
+                counts[table] = getattr(res, "count", None) or 0
             except Exception as e:
                 self.log_warning(f"Error contando en {table}: {e}")
                 counts[table] = -1
@@ -416,47 +795,78 @@ class SupabaseAgent(BaseAgent):
             res = self.client.table("BD_DocumentosCargados").select(
                 "ID_DocumentoCargado", count="exact"
             ).eq("ID_Municipio", muni_id).execute()
-            counts["BD_DocumentosCargados"] = res.count if hasattr(res, "count") else 0
-            doc_ids = [row["ID_DocumentoCargado"] for row in (res.data or [])]
+            counts["BD_DocumentosCargados"] = getattr(res, "count", None) or 0
+            doc_ids = [row["ID_DocumentoCargado"] for row in (getattr(res, "data", None) or [])]
         except Exception as e:
             self.log_warning(f"Error contando documentos: {e}")
             return counts
 
-        # Contar registros de cada documento
-        doc_tables = [
-            "bd_recursos", "bd_gastos", "bd_jurisdiccion",
-            "bd_situacionpatrimonial", "bd_movimientosTesoreria", "bd_cuentas",
-        ]
+        # Contar registros de todos los documentos en un solo request
+        if not doc_ids:
+            counts.update(dict.fromkeys(DOC_TABLES, 0))
+            return counts
+        try:
+            rows = self._rpc("count_by_docs", {"tables": list(DOC_TABLES), "doc_ids": doc_ids})
+        except Exception as e:
+            self.log_warning(f"Error contando por documentos: {e}")
+            rows = None
+        if rows is not None:
+            by_table = {row["table_name"]: row["cnt"] for row in rows}
+            for table in DOC_TABLES:
+                counts[table] = by_table.get(table, 0)
+            return counts
 
-        for table in doc_tables:
+        # Sin la RPC: un count por tabla y documento
+        for table in DOC_TABLES:
+            pk = self.config.get_table_info(table)["pk"]
             total = 0
             for doc_id in doc_ids:
                 try:
                     res = self.client.table(table).select(
-                        "*", count="exact"
+                        pk, count="exact"
                     ).eq("ID_DocumentoCargado", doc_id).limit(0).execute()
-                    total += res.count if hasattr(res, "count") else 0
+                    total += getattr(res, "count", None) or 0
                 except Exception:
                     pass
             counts[table] = total
 
         return counts
 
-    def get_document_status_summary(self) -> Dict[str, int]:
+    def get_document_status_summary(self, *, use_cache: bool = True) -> Dict[str, int]:
         """
         Obtiene resumen de documentos por estado.
 
+        Args:
+            use_cache: Si False, ignora un resumen de menos de SUMMARY_TTL s
+
         Returns:
             Dict con conteo por estado
         """
+        def build() -> Dict[str, int]:
+            # GROUP BY en Postgres: viaja una fila por estado
+            if self._aggregates_ok:
+                try:
+                    res = self.client.table("BD_DocumentosCargados").select(
+                        "Doc_Estado,count()"
+                    ).execute()
+                    return {
+                        row["Doc_Estado"]: row["count"]
+                        for row in (getattr(res, "data", None) or [])
+                    }
+                except Exception as e:
+                    self.log_debug("Agregados no disponibles, contando en Python: %s", e)
+                    self._aggregates_ok = False
+
+            status_counts = Counter()
+            for rows in self._iter_rows(
+                "BD_DocumentosCargados", "Doc_Estado", "ID_DocumentoCargado",
+            ):
+                status_counts.update(row.get("Doc_Estado", "desconocido") for row in rows)
+            return dict(status_counts)
+
         try:
-            res = self.client.table("BD_DocumentosCargados").select("Doc_Estado").execute()
-            status_counts = {}
-            if hasattr(res, "data") and res.data:
-                for row in res.data:
-                    status = row.get("Doc_Estado", "desconocido")
-                    status_counts[status] = status_counts.get(status, 0) + 1
-            return status_counts
+            # Copia: el dict cacheado no debe quedar expuesto a modificaciones
+            return dict(self._cached_summary(("document_status",), build, use_cache))
         except Exception as e:
             self.log_error(f"Error obteniendo estados: {e}")
             return {}
@@ -509,10 +919,15 @@ class SupabaseAgent(BaseAgent):
                 "dry_run": True,
             }
 
-        # Ejecutar eliminación
+        # Ejecutar eliminación, un request por lote de DELETE_BATCH IDs
+        self.invalidate_summaries()
+        deleted = 0
         try:
             from pipeline.load_supabase import delete_rows
-            deleted = delete_rows(self.client, table_name, pk, orphan_ids)
+            for start in range(0, len(orphan_ids), DELETE_BATCH):
+                deleted += delete_rows(
+                    self.client, table_name, pk, orphan_ids[start:start + DELETE_BATCH]
+                )
             return {
                 "status": "ok",
                 "message": f"Eliminados {deleted} registros",
@@ -523,7 +938,7 @@ class SupabaseAgent(BaseAgent):
             return {
                 "status": "error",
                 "message": f"Error eliminando: {e}",
-                "deleted": 0,
+                "deleted": deleted,
                 "dry_run": False,
             }
 
@@ -545,10 +960,7 @@ class SupabaseAgent(BaseAgent):
             Dict con resultado
         """
         if tables is None:
-            tables = [
-                "bd_recursos", "bd_gastos", "bd_jurisdiccion",
-                "bd_situacionpatrimonial", "bd_movimientosTesoreria", "bd_cuentas",
-            ]
+            tables = list(DOC_TABLES)
 
         counts = self.count_records_by_document(doc_id)
 
@@ -560,32 +972,106 @@ class SupabaseAgent(BaseAgent):
                 "dry_run": True,
             }
 
-        # Ejecutar eliminación
-        deleted = {}
-        try:
-            from pipeline.load_supabase import delete_rows_by_filters
-            for table in tables:
-                if counts.get(table, 0) > 0:
-                    n = delete_rows_by_filters(
-                        self.client, table, {"ID_DocumentoCargado": doc_id}
-                    )
-                    deleted[table] = n
-            return {
-                "status": "ok",
-                "message": "Datos eliminados",
-                "deleted": deleted,
-                "dry_run": False,
-            }
-        except Exception as e:
+        # Ejecutar eliminación: un DELETE por tabla, todas en paralelo
+        self.invalidate_summaries()
+        from pipeline.load_supabase import delete_rows_by_filters
+
+        def clear(table: str) -> tuple:
+            try:
+                n = delete_rows_by_filters(
+                    self.client, table, {"ID_DocumentoCargado": doc_id}
+                )
+                return table, n, None
+            except Exception as e:
+                return table, 0, e
+
+        results = self._map_io(
+            clear, [t for t in tables if counts.get(t, 0) > 0], IO_WORKERS,
+        )
+        deleted = {table: n for table, n, error in results if error is None}
+        errors = [error for _, _, error in results if error is not None]
+        if errors:
             return {
                 "status": "error",
-                "message": f"Error eliminando: {e}",
+                "message": f"Error eliminando: {errors[0]}",
                 "deleted": deleted,
                 "dry_run": False,
             }
+        return {
+            "status": "ok",
+            "message": "Datos eliminados",
+            "deleted": deleted,
+            "dry_run": False,
+        }
 
     # === Export/Import ===
 
+    def _export_batches(
+        self,
+        table_name: str,
+        filters: Optional[Dict[str, Any]],
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Lotes de filas a exportar (ignora filtros con valor None)."""
+        table_config = self.config.get_table_info(table_name)
+        if not table_config:
+            raise ValueError(f"Tabla '{table_name}' no configurada")
+
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        # Único lugar con select("*"): exportar es justamente traer todas las columnas
+        return self._iter_rows(table_name, "*", table_config["pk"], filters)
+
+    def iter_export_csv(
+        self,
+        table_name: str,
+        filters: Dict[str, Any] = None,
+    ) -> Iterator[bytes]:
+        """
+        Exporta una tabla a CSV en trozos, sin armar el archivo en memoria.
+
+        Args:
+            table_name: Nombre de la tabla
+            filters: Filtros a aplicar (opcional)
+
+        Yields:
+            CSV en UTF-8, un trozo por lote de PAGE_SIZE filas (el primero
+            con el header). Una tabla vacía no produce ningún trozo.
+        """
+        buffer = io.StringIO()
+        writer = None
+        for rows in self._export_batches(table_name, filters):
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=rows[0].keys())
+                writer.writeheader()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    def iter_export_json(
+        self,
+        table_name: str,
+        filters: Dict[str, Any] = None,
+    ) -> Iterator[bytes]:
+        """
+        Exporta una tabla como array JSON en trozos (mismo formato que
+        to_json, indentado a 2), serializando cada lote directo a bytes.
+
+        Args:
+            table_name: Nombre de la tabla
+            filters: Filtros a aplicar (opcional)
+
+        Yields:
+            JSON en UTF-8, un trozo por lote de PAGE_SIZE filas
+        """
+        separator = b"[\n  "
+        for rows in self._export_batches(table_name, filters):
+            # JSON no admite newlines crudos dentro de strings: reindentar
+            # por líneas es seguro
+            items = [_json.dumps_bytes(row).replace(b"\n", b"\n  ") for row in rows]
+            yield separator + b",\n  ".join(items)
+            separator = b",\n  "
+        yield b"[]" if separator == b"[\n  " else b"\n]"
+
     def export_table_data(
         self,
         table_name: str,
@@ -595,6 +1081,9 @@ class SupabaseAgent(BaseAgent):
         """
         Exporta datos de una tabla.
 
+        Para tablas grandes conviene iter_export_json / iter_export_csv, que
+        no juntan todo el resultado en un string.
+
         Args:
             table_name: Nombre de la tabla
             filters: Filtros a aplicar (opcional)
@@ -603,27 +1092,9 @@ class SupabaseAgent(BaseAgent):
         Returns:
             String con datos exportados
         """
-        query = self.client.table(table_name).select("*")
-
-        if filters:
-            for key, value in filters.items():
-                if value is not None:
-                    query = query.eq(key, value)
-
-        res = query.execute()
-        data = res.data if hasattr(res, "data") else []
-
         if format == "json":
-            return self.to_json(data)
+            return b"".join(self.iter_export_json(table_name, filters)).decode("utf-8")
         elif format == "csv":
-            if not data:
-                return ""
-            import csv
-            import io
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=data[0].keys())
-            writer.writeheader()
-            writer.writerows(data)
-            return output.getvalue()
+            return b"".join(self.iter_export_csv(table_name, filters)).decode("utf-8")
         else:
             raise ValueError(f"Formato no soportado: {format}")
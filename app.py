@@ -2,7 +2,10 @@
 import streamlit as st
 import pandas as pd
 import os
+import random
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 import httpx
 try:
@@ -16,10 +19,9 @@ from supabase_client import get_supabase_client
 from postgrest.exceptions import APIError
 from pipeline.ingest_pdf import ingest_pdf
 from pipeline.load_supabase import (
-    fetch_documents,
     delete_rows,
     delete_pdf_from_storage,
-    download_pdf_from_storage,
+    download_pdf_stream,
 )
 from pipeline.runner import run_document
 from pipeline.ingest_xlsx import ingest_rafam_xlsx
@@ -34,12 +36,23 @@ if not hasattr(st, "experimental_rerun") and hasattr(st, "rerun"):
 st.set_page_config(page_title="Municipios PBA", layout="wide")
 st.title("Municipios PBA – Navegador de información contable")
 
-# Cliente de Supabase (usa tu supabase_client y secrets.toml con url/key)
+# Cliente de Supabase (usa tu supabase_client y secrets.toml con url/key).
+# get_supabase_client ya es @st.cache_resource: un solo cliente (y su pool
+# httpx) por proceso, reusado entre reruns y sesiones
 supabase = get_supabase_client()
 
 # -------------------------------------------------
 # RETRIES + CACHE
 # -------------------------------------------------
+_RETRY_ERRORS = (
+    httpx.ReadError,
+    httpx.ConnectError,
+    httpx.ReadTimeout,
+    httpx.PoolTimeout,
+    httpx.RemoteProtocolError,  # conexión keep-alive/HTTP2 cerrada por el server
+)
+
+
 def _execute_with_retry(self, *args, **kwargs):
     retries = 3
     base_sleep = 0.5
@@ -47,39 +60,204 @@ def _execute_with_retry(self, *args, **kwargs):
     for attempt in range(retries):
         try:
             return _orig_execute(self, *args, **kwargs)
-        except (httpx.ReadError, httpx.ConnectError, httpx.ReadTimeout) as exc:
+        except _RETRY_ERRORS as exc:
             last_exc = exc
-            time.sleep(base_sleep * (2 ** attempt))
+            if attempt < retries - 1:
+                # Jitter para que los reintentos de varias sesiones no coincidan
+                time.sleep(base_sleep * (2 ** attempt) + random.random() * 0.2)
     raise last_exc
 
 if _RequestBuilder is not None and hasattr(_RequestBuilder, "execute"):
     _orig_execute = _RequestBuilder.execute
     _RequestBuilder.execute = _execute_with_retry
 
-@st.cache_data(ttl=300, show_spinner=False)
-def _cached_select(table: str, filters: Optional[dict] = None):
-    q = supabase.table(table).select("*")
-    if filters:
-        for k, v in filters.items():
-            q = q.eq(k, v)
-    res = q.execute()
+@st.cache_resource
+def _versiones_tablas() -> dict:
+    # {tabla: versión}, compartido por todas las sesiones del proceso. Se
+    # incrementa al escribir la tabla desde la app (ver _invalidar_tabla)
+    return {}
+
+
+def _tabla_version(table: str) -> int:
+    return _versiones_tablas().get(table, 0)
+
+
+def _invalidar_tabla(table: str) -> None:
+    # Las entradas cacheadas de `table` dejan de coincidir; el resto sigue
+    versiones = _versiones_tablas()
+    versiones[table] = versiones.get(table, 0) + 1
+
+
+# Columnas que usa la app de cada tabla cacheada (listado, selectores,
+# ficha); el resto no viaja
+COLUMNAS_MUNICIPIO = ",".join([
+    "ID_Municipio",
+    "Muni_Nombre",
+    "Muni_SeccionElectoral",
+    "Muni_CiudadCabecera",
+    "Muni_AnoCreacion",
+    "Muni_Poblacion_2022",
+    "Muni_Superficie",
+    "Muni_Densidad",
+    "Muni_Categoria",
+    "Muni_Cantidad_Trabajadores",
+    "Muni_Cantidad_Concejales",
+    "Muni_Cantidad_ConsejerosEscolares",
+    "Muni_IntendenteActual",
+    "Muni_LinkBO",
+    "Muni_LinkDocumentoContableEncontrado",
+    "Muni_LinkSectorDatos",
+])
+COLUMNAS_DOCUMENTO = ",".join([
+    "ID_DocumentoCargado",
+    "ID_Municipio",
+    "Doc_Nombre",
+    "Doc_Tipo",
+    "Doc_Periodo",
+    "Doc_Anio",
+    "Doc_Estado",
+    "Doc_ArchivoStoragePath",
+])
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _select_versionado(table: str, filters: Optional[dict], cols: str, version: int):
+    def run(select_cols: str):
+        q = supabase.table(table).select(select_cols)
+        if filters:
+            for k, v in filters.items():
+                q = q.eq(k, v)
+        return q.execute()
+
+    try:
+        res = run(cols)
+    except APIError as exc:
+        # 42703 = columna inexistente: traer todas. Otros errores (RLS,
+        # filtros) fallarían igual con "*"
+        if cols == "*" or getattr(exc, "code", None) != "42703":
+            raise
+        res = run("*")
     return res.data if res.data else []
 
+
+def _cached_select(table: str, filters: Optional[dict] = None, cols: str = "*"):
+    return _select_versionado(table, filters, cols, _tabla_version(table))
+
+
+@st.cache_resource
+def _openai_client(api_key: str):
+    # Un cliente (y su pool httpx) por key, no uno por click en "Procesar"
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+
+@st.cache_resource
+def _single_shot_settings():
+    from single_shot.settings import load_settings
+    return load_settings()
+
+
+def _guardar_upload(uploaded, path: str) -> None:
+    """Copia un archivo subido a disco en bloques de 1 MiB (sin getvalue())."""
+    uploaded.seek(0)
+    with open(path, "wb") as handle:
+        shutil.copyfileobj(uploaded, handle, length=1024 * 1024)
+
+
+def _select_paralelo(consultas: dict) -> dict:
+    """
+    Ejecuta {nombre: query} en paralelo y devuelve {nombre: filas}.
+    Son independientes y casi todo es espera de red: el tiempo total es el de
+    la más lenta, no la suma (el pool httpx del cliente es thread-safe).
+    """
+    if not consultas:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(consultas)) as pool:
+        futures = {nombre: pool.submit(q.execute) for nombre, q in consultas.items()}
+        return {nombre: (f.result().data or []) for nombre, f in futures.items()}
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _muni_vista(columnas: tuple, version: int) -> pd.DataFrame:
+    # Vista rápida de municipios, armada una vez sobre el mismo cache de filas
+    return pd.DataFrame(
+        _cached_select("bd_municipios", cols=COLUMNAS_MUNICIPIO), columns=list(columnas)
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _muni_options(version: int):
+    # (labels, ids) del selector de municipio, ya ordenados por label
+    municipios = _cached_select("bd_municipios", cols=COLUMNAS_MUNICIPIO)
+    labels = [
+        f"{m['Muni_Nombre']} (Sec. {m.get('Muni_SeccionElectoral', 's/d')})"
+        for m in municipios
+    ]
+    orden = sorted(range(len(labels)), key=labels.__getitem__)
+    return (
+        tuple(labels[i] for i in orden),
+        tuple(municipios[i]["ID_Municipio"] for i in orden),
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _doc_options(docs_key: tuple):
+    """
+    Opciones de los selectores de documento, armadas una vez por lista.
+    docs_key: tuplas (ID, Nombre, Tipo, Periodo, Anio) de cada documento.
+    Devuelve (labels, ids, {id: indice}).
+    """
+    labels = tuple(
+        f"{nombre} ({tipo} {periodo} {anio})"
+        for _, nombre, tipo, periodo, anio in docs_key
+    )
+    ids = tuple(key[0] for key in docs_key)
+    return labels, ids, {doc_id: i for i, doc_id in enumerate(ids)}
+
+
+def _docs_key(docs: list) -> tuple:
+    return tuple(
+        (
+            d["ID_DocumentoCargado"],
+            d.get("Doc_Nombre", "s/n"),
+            d.get("Doc_Tipo", ""),
+            d.get("Doc_Periodo", ""),
+            d.get("Doc_Anio", ""),
+        )
+        for d in docs
+    )
+
 # -------------------------------------------------
 # HELPERS (sanitizar + guardar cambios)
 # -------------------------------------------------
 def _sanitize(v):
-    # Convierte "" y NaN a None para evitar errores de Postgres (numeric/not-null)
-    try:
-        if pd.isna(v):
-            return None
-    except Exception:
-        pass
-    if isinstance(v, str) and v.strip() == "":
+    # Convierte "" y NaN a None para evitar errores de Postgres (numeric/not-null).
+    # Chequeos de tipo en vez de try/pd.isna: es lo que corre por celda
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, float):
+        return None if v != v else v
+    if isinstance(v, str) and not v.strip():
         return None
     return v
 
 
+def _sanitize_df(df: pd.DataFrame) -> pd.DataFrame:
+    # _sanitize para todo el DataFrame de una vez: NaN/None/"" -> None (dtype object)
+    vacio = df.isna().to_numpy()
+    for j, col in enumerate(df.columns):
+        try:
+            blanco = df.iloc[:, j].str.strip().eq("")
+        except AttributeError:  # columna sin strings
+            continue
+        vacio[:, j] |= blanco.to_numpy(dtype=bool, na_value=False)
+    return df.astype(object).where(~vacio, None)
+
+
+# Filas por upsert: acota el tamaño del request a PostgREST
+UPSERT_BATCH = 500
+
+
 def guardar_cambios_df(
     *,
     tabla: str,
@@ -108,29 +286,28 @@ def guardar_cambios_df(
         st.warning("No hay columnas editables disponibles en el dataframe.")
         return 0
 
+    # Diff vectorizado (por posición, como el data_editor): matriz de celdas
+    # editables que cambiaron, ya sanitizadas
+    orig_e = _sanitize_df(df_original[columnas_editables]).to_numpy()
+    edit_e = _sanitize_df(df_editado[columnas_editables]).to_numpy()
+    cambiado = orig_e != edit_e
+    filas = cambiado.any(axis=1).nonzero()[0]
+
     rows_to_upsert = []
-    for i in range(len(df_original)):
-        orig = df_original.iloc[i]
-        edit = df_editado.iloc[i]
-
-        cambios = {}
-        for col in columnas_editables:
-            a = _sanitize(orig[col])
-            b = _sanitize(edit[col])
-            if a != b:
-                cambios[col] = b
-
-        if cambios:
-            # Upsert requiere columnas NOT NULL. Enviamos la fila completa
-            # para evitar que columnas obligatorias queden en NULL.
-            cols_src = columnas_en_tabla or list(df_original.columns)
-            full_row = {col: _sanitize(orig[col]) for col in cols_src if col in df_original.columns}
-            full_row.update(cambios)
-            rows_to_upsert.append(full_row)
+    if filas.size:
+        # Upsert requiere columnas NOT NULL. Enviamos la fila completa
+        # para evitar que columnas obligatorias queden en NULL.
+        cols_src = columnas_en_tabla or list(df_original.columns)
+        cols_src = [col for col in cols_src if col in df_original.columns]
+        rows_to_upsert = _sanitize_df(df_original.iloc[filas][cols_src]).to_dict("records")
+        for full_row, i in zip(rows_to_upsert, filas):
+            for j in cambiado[i].nonzero()[0]:
+                full_row[columnas_editables[j]] = edit_e[i, j]
 
     if rows_to_upsert:
-        supabase.table(tabla).upsert(rows_to_upsert).execute()
-        st.cache_data.clear()
+        for start in range(0, len(rows_to_upsert), UPSERT_BATCH):
+            supabase.table(tabla).upsert(rows_to_upsert[start:start + UPSERT_BATCH]).execute()
+        _invalidar_tabla(tabla)
 
     return len(rows_to_upsert)
 
@@ -279,7 +456,7 @@ if st.sidebar.button("Cerrar sesión"):
 # -------------------------------------------------
 # 1) LISTADO Y SELECCIÓN DE MUNICIPIO
 # -------------------------------------------------
-municipios = _cached_select("bd_municipios")
+municipios = _cached_select("bd_municipios", cols=COLUMNAS_MUNICIPIO)
 
 if not municipios:
     st.info("Todavía no hay municipios cargados en la tabla bd_municipios.")
@@ -297,22 +474,20 @@ columnas_vista = [
 ]
 columnas_vista = [c for c in columnas_vista if c in municipios[0].keys()]
 
-st.dataframe([{c: m.get(c) for c in columnas_vista} for m in municipios])
+st.dataframe(_muni_vista(tuple(columnas_vista), _tabla_version("bd_municipios")))
 
 st.subheader("Seleccionar municipio")
 
-opciones_muni = {
-    f"{m['Muni_Nombre']} (Sec. {m.get('Muni_SeccionElectoral', 's/d')})": m["ID_Municipio"]
-    for m in municipios
-}
-
-opciones_muni_ordenadas = sorted(opciones_muni.keys())
-nombre_muni_sel = st.selectbox("Eleg?� un municipio", opciones_muni_ordenadas)
+muni_labels, muni_ids = _muni_options(_tabla_version("bd_municipios"))
+idx_muni = st.selectbox(
+    "Eleg?� un municipio", range(len(muni_ids)), format_func=muni_labels.__getitem__
+)
 
-if not nombre_muni_sel:
+if idx_muni is None:
     st.stop()
 
-id_muni_sel = opciones_muni[nombre_muni_sel]
+nombre_muni_sel = muni_labels[idx_muni]
+id_muni_sel = muni_ids[idx_muni]
 
 # Si cambia el municipio, reseteamos el documento seleccionado
 prev_muni_id = st.session_state.get("municipio_seleccionado_id")
@@ -331,14 +506,9 @@ st.success(f"Municipio seleccionado: {nombre_muni_sel}")
 st.markdown("---")
 st.subheader("Ficha del municipio")
 
-res_m = (
-    supabase.table("bd_municipios")
-    .select("*")
-    .eq("ID_Municipio", id_muni_sel)
-    .single()
-    .execute()
-)
-muni = res_m.data
+# La fila ya vino en _cached_select("bd_municipios"): sin round-trip extra
+muni_by_id = {m["ID_Municipio"]: m for m in municipios}
+muni = muni_by_id.get(id_muni_sel)
 
 if muni is None:
     st.error("No se encontró el municipio en la base.")
@@ -396,30 +566,23 @@ with cols_links[2]:
 st.markdown("---")
 st.subheader("Documentos cargados para este municipio")
 
-documentos = _cached_select("BD_DocumentosCargados", {"ID_Municipio": id_muni_sel})
+documentos = _cached_select(
+    "BD_DocumentosCargados", {"ID_Municipio": id_muni_sel}, cols=COLUMNAS_DOCUMENTO
+)
+# Labels/IDs compartidos por todos los selectores de documento de la página
+doc_labels, doc_ids, doc_index = _doc_options(_docs_key(documentos))
 
 doc_id_sel = st.session_state.get("documento_seleccionado_id", None)
 
 if documentos:
-    opciones_docs = {
-        f'{d.get("Doc_Nombre", "")} ({d.get("Doc_Tipo", "")} {d.get("Doc_Periodo", "")} {d.get("Doc_Anio", "")})': d[
-            "ID_DocumentoCargado"
-        ]
-        for d in documentos
-    }
-
-    nombres_docs = list(opciones_docs.keys())
-    index_default = 0
-    if doc_id_sel:
-        for i, nombre in enumerate(nombres_docs):
-            if opciones_docs[nombre] == doc_id_sel:
-                index_default = i
-                break
-
-    nombre_doc_sel = st.selectbox(
-        "Elegí un documento", nombres_docs, index=index_default
+    idx_doc = st.selectbox(
+        "Elegí un documento",
+        range(len(doc_ids)),
+        index=doc_index.get(doc_id_sel, 0),
+        format_func=doc_labels.__getitem__,
     )
-    doc_id_sel = opciones_docs[nombre_doc_sel]
+    nombre_doc_sel = doc_labels[idx_doc]
+    doc_id_sel = doc_ids[idx_doc]
     st.session_state["documento_seleccionado_id"] = doc_id_sel
     st.session_state["documento_seleccionado_nombre"] = nombre_doc_sel
 
@@ -451,7 +614,7 @@ if doc_id_sel:
                 supabase, "BD_DocumentosCargados", "ID_DocumentoCargado", [doc_id_sel]
             )
             st.success(f"Documento borrado: {deleted}")
-            st.cache_data.clear()
+            _invalidar_tabla("BD_DocumentosCargados")
             st.experimental_rerun()
 else:
     st.info("No hay documento seleccionado para borrar.")
@@ -490,7 +653,7 @@ with st.form("form_documento"):
         result = ingest_pdf(supabase, pdf_bytes, doc_pdf.name, metadata)
         if result["ok"]:
             st.success("Documento creado y PDF subido correctamente.")
-            st.cache_data.clear()
+            _invalidar_tabla("BD_DocumentosCargados")
             st.experimental_rerun()
         else:
             st.error(f"Error al crear el documento: {result['error']}")
@@ -501,14 +664,8 @@ with st.form("form_documento"):
 st.markdown("---")
 st.subheader("Procesar documento (manual)")
 
-try:
-    docs_pendientes = fetch_documents(
-        supabase,
-        {"ID_Municipio": id_muni_sel, "Doc_Estado": "Pendiente"},
-    )
-except Exception as e:
-    st.error(f"Error al buscar documentos pendientes: {e}")
-    docs_pendientes = []
+# Subconjunto de `documentos` (ya filtrados por municipio): sin otra consulta
+docs_pendientes = [d for d in documentos if d.get("Doc_Estado") == "Pendiente"]
 
 docs_pendientes_con_pdf = [
     d for d in docs_pendientes if d.get("Doc_ArchivoStoragePath")
@@ -540,6 +697,8 @@ else:
         progress.progress(25, text="Ejecutando runner...")
         resultado = run_document(supabase, doc_id_pend)
         progress.progress(100, text="Finalizado.")
+        # El estado del documento cambió: refrescar `documentos`
+        _invalidar_tabla("BD_DocumentosCargados")
 
         if resultado["ok"]:
             st.success("Documento procesado correctamente.")
@@ -556,28 +715,14 @@ st.subheader("Procesar documento (XLSX RAFAM)")
 st.caption("Carga desde Excel tabulado (Table 1-4).")
 
 if documentos:
-    opciones_docs_xlsx = {
-        f'{d.get("Doc_Nombre", "s/n")} ({d.get("Doc_Tipo", "")} {d.get("Doc_Periodo", "")} {d.get("Doc_Anio", "")})': d.get(
-            "ID_DocumentoCargado"
-        )
-        for d in documentos
-    }
-
-    nombres_xlsx = list(opciones_docs_xlsx.keys())
-    index_xlsx = 0
-    if doc_id_sel:
-        for i, nombre in enumerate(nombres_xlsx):
-            if opciones_docs_xlsx[nombre] == doc_id_sel:
-                index_xlsx = i
-                break
-
-    nombre_doc_xlsx = st.selectbox(
+    idx_xlsx = st.selectbox(
         "Documento destino (ID_DocumentoCargado)",
-        nombres_xlsx,
-        index=index_xlsx,
+        range(len(doc_ids)),
+        index=doc_index.get(doc_id_sel, 0),
+        format_func=doc_labels.__getitem__,
         key="xlsx_doc_sel",
     )
-    doc_id_xlsx = opciones_docs_xlsx[nombre_doc_xlsx]
+    doc_id_xlsx = doc_ids[idx_xlsx]
 
     xlsx_file = st.file_uploader("XLSX RAFAM", type=["xlsx"], key="xlsx_file")
     xlsx_path_input = st.text_input("Ruta local al XLSX (opcional)", key="xlsx_path")
@@ -591,8 +736,7 @@ if documentos:
                 "logs",
                 f"rafam_xlsx_{doc_id_xlsx}_{time.strftime('%Y%m%d_%H%M%S')}.xlsx",
             )
-            with open(xlsx_path, "wb") as handle:
-                handle.write(xlsx_file.getvalue())
+            _guardar_upload(xlsx_file, xlsx_path)
         else:
             xlsx_path = (xlsx_path_input or "").strip()
             if xlsx_path and not os.path.exists(xlsx_path):
@@ -642,28 +786,14 @@ st.subheader("Procesar documento (XLSX + LLM)")
 st.caption("Pipeline LLM para XLSX (distinto del Single-Shot PDF).")
 
 if documentos:
-    opciones_docs_xlsx_llm = {
-        f'{d.get("Doc_Nombre", "s/n")} ({d.get("Doc_Tipo", "")} {d.get("Doc_Periodo", "")} {d.get("Doc_Anio", "")})': d.get(
-            "ID_DocumentoCargado"
-        )
-        for d in documentos
-    }
-
-    nombres_xlsx_llm = list(opciones_docs_xlsx_llm.keys())
-    index_xlsx_llm = 0
-    if doc_id_sel:
-        for i, nombre in enumerate(nombres_xlsx_llm):
-            if opciones_docs_xlsx_llm[nombre] == doc_id_sel:
-                index_xlsx_llm = i
-                break
-
-    nombre_doc_xlsx_llm = st.selectbox(
+    idx_xlsx_llm = st.selectbox(
         "Documento destino (ID_DocumentoCargado)",
-        nombres_xlsx_llm,
-        index=index_xlsx_llm,
+        range(len(doc_ids)),
+        index=doc_index.get(doc_id_sel, 0),
+        format_func=doc_labels.__getitem__,
         key="xlsx_llm_doc_sel",
     )
-    doc_id_xlsx_llm = opciones_docs_xlsx_llm[nombre_doc_xlsx_llm]
+    doc_id_xlsx_llm = doc_ids[idx_xlsx_llm]
 
     xlsx_file_llm = st.file_uploader("XLSX RAFAM", type=["xlsx"], key="xlsx_llm_file")
     xlsx_path_input_llm = st.text_input(
@@ -678,8 +808,7 @@ if documentos:
                 "logs",
                 f"xlsx_llm_{doc_id_xlsx_llm}_{time.strftime('%Y%m%d_%H%M%S')}.xlsx",
             )
-            with open(xlsx_path_llm, "wb") as handle:
-                handle.write(xlsx_file_llm.getvalue())
+            _guardar_upload(xlsx_file_llm, xlsx_path_llm)
         else:
             xlsx_path_llm = (xlsx_path_input_llm or "").strip()
             if xlsx_path_llm and not os.path.exists(xlsx_path_llm):
@@ -701,15 +830,13 @@ if documentos:
             st.error("Falta OPENAI_API_KEY (env o st.secrets).")
         else:
             try:
-                from openai import OpenAI
                 from single_shot.pipeline_xlsx import run_single_shot_xlsx
-                from single_shot.settings import load_settings
+                client_openai = _openai_client(openai_key)
+                settings = _single_shot_settings()
             except Exception as exc:
                 st.error(f"No se pudo cargar el pipeline XLSX LLM: {exc}")
             else:
                 with st.spinner("Ejecutando XLSX + LLM..."):
-                    settings = load_settings()
-                    client_openai = OpenAI(api_key=openai_key)
                     log_path = os.path.join(
                         "logs",
                         f"xlsx_llm_{time.strftime('%Y%m%d_%H%M%S')}.jsonl",
@@ -727,6 +854,8 @@ if documentos:
                         doc_id=doc_id_xlsx_llm,
                     )
 
+                # El pipeline puede crear/actualizar el documento
+                _invalidar_tabla("BD_DocumentosCargados")
                 st.success("XLSX + LLM finalizado.")
                 st.json(summary)
                 st.caption(f"Log: {log_path}")
@@ -742,102 +871,81 @@ st.subheader("Procesar documento (Single-Shot)")
 st.caption("Una sola llamada LLM para cargar todas las tablas en bd_*.")
 
 if documentos:
-    documentos_ss = [d for d in documentos if d.get("ID_Municipio") == id_muni_sel]
-    if not documentos_ss:
-        st.info("No hay documentos del municipio seleccionado para Single-Shot.")
-    else:
-        opciones_docs_ss = {
-            f'{d.get("Doc_Nombre", "s/n")} ({d.get("Doc_Tipo", "")} {d.get("Doc_Periodo", "")} {d.get("Doc_Anio", "")})': d.get(
-                "ID_DocumentoCargado"
-            )
-            for d in documentos_ss
-        }
-
-        nombres_ss = list(opciones_docs_ss.keys())
-        index_ss = 0
-        if doc_id_sel:
-            for i, nombre in enumerate(nombres_ss):
-                if opciones_docs_ss[nombre] == doc_id_sel:
-                    index_ss = i
-                    break
-
-        nombre_doc_ss = st.selectbox(
-            "Documento destino (ID_DocumentoCargado)",
-            nombres_ss,
-            index=index_ss,
-            key="ss_doc_sel",
-        )
-        doc_id_ss = opciones_docs_ss[nombre_doc_ss]
-        pdf_path_ss = st.text_input("Ruta local al PDF (opcional)", key="ss_pdf_path")
-
-        if st.button("Procesar con Single-Shot", key="ss_run"):
-            pdf_source_path = (pdf_path_ss or "").strip()
-            if pdf_source_path:
-                if not os.path.exists(pdf_source_path):
-                    st.error("Ruta de PDF invalida o no existe.")
-                    pdf_source_path = ""
-            if not pdf_source_path:
-                doc_sel = next((d for d in documentos_ss if d.get("ID_DocumentoCargado") == doc_id_ss), None)
-                storage_path = doc_sel.get("Doc_ArchivoStoragePath") if doc_sel else None
-                if not storage_path:
-                    st.error("No hay PDF en storage para este documento. Carga una ruta local.")
+    idx_ss = st.selectbox(
+        "Documento destino (ID_DocumentoCargado)",
+        range(len(doc_ids)),
+        index=doc_index.get(doc_id_sel, 0),
+        format_func=doc_labels.__getitem__,
+        key="ss_doc_sel",
+    )
+    doc_id_ss = doc_ids[idx_ss]
+    pdf_path_ss = st.text_input("Ruta local al PDF (opcional)", key="ss_pdf_path")
+
+    if st.button("Procesar con Single-Shot", key="ss_run"):
+        pdf_source_path = (pdf_path_ss or "").strip()
+        if pdf_source_path:
+            if not os.path.exists(pdf_source_path):
+                st.error("Ruta de PDF invalida o no existe.")
+                pdf_source_path = ""
+        if not pdf_source_path:
+            doc_sel = next((d for d in documentos if d.get("ID_DocumentoCargado") == doc_id_ss), None)
+            storage_path = doc_sel.get("Doc_ArchivoStoragePath") if doc_sel else None
+            if not storage_path:
+                st.error("No hay PDF en storage para este documento. Carga una ruta local.")
+                pdf_source_path = ""
+            else:
+                try:
+                    os.makedirs("logs", exist_ok=True)
+                    pdf_source_path = os.path.join(
+                        "logs",
+                        f"single_shot_pdf_{doc_id_ss}_{time.strftime('%Y%m%d_%H%M%S')}.pdf",
+                    )
+                    download_pdf_stream(supabase, "pdfs", storage_path, pdf_source_path)
+                except Exception as exc:
+                    st.error(f"No se pudo descargar el PDF desde storage: {exc}")
                     pdf_source_path = ""
-                else:
-                    try:
-                        pdf_bytes = download_pdf_from_storage(supabase, "pdfs", storage_path)
-                        os.makedirs("logs", exist_ok=True)
-                        pdf_source_path = os.path.join(
-                            "logs",
-                            f"single_shot_pdf_{doc_id_ss}_{time.strftime('%Y%m%d_%H%M%S')}.pdf",
-                        )
-                        with open(pdf_source_path, "wb") as handle:
-                            handle.write(pdf_bytes)
-                    except Exception as exc:
-                        st.error(f"No se pudo descargar el PDF desde storage: {exc}")
-                        pdf_source_path = ""
-            if not pdf_source_path:
-                st.stop()
+        if not pdf_source_path:
+            st.stop()
 
+        openai_key = ""
+        try:
+            openai_key = st.secrets.get("openai", {}).get("api_key", "")
+        except Exception:
             openai_key = ""
+        if not openai_key:
+            openai_key = os.getenv("OPENAI_API_KEY", "")
+        if not openai_key:
+            st.error("Falta OPENAI_API_KEY (env o st.secrets).")
+        else:
             try:
-                openai_key = st.secrets.get("openai", {}).get("api_key", "")
-            except Exception:
-                openai_key = ""
-            if not openai_key:
-                openai_key = os.getenv("OPENAI_API_KEY", "")
-            if not openai_key:
-                st.error("Falta OPENAI_API_KEY (env o st.secrets).")
+                from single_shot.pipeline import run_single_shot
+                client_openai = _openai_client(openai_key)
+                settings = _single_shot_settings()
+            except Exception as exc:
+                st.error(f"No se pudo cargar el pipeline Single-Shot: {exc}")
             else:
-                try:
-                    from openai import OpenAI
-                    from single_shot.pipeline import run_single_shot
-                    from single_shot.settings import load_settings
-                except Exception as exc:
-                    st.error(f"No se pudo cargar el pipeline Single-Shot: {exc}")
-                else:
-                    with st.spinner("Ejecutando Single-Shot..."):
-                        settings = load_settings()
-                        client_openai = OpenAI(api_key=openai_key)
-                        log_path = os.path.join(
-                            "logs",
-                            f"single_shot_{time.strftime('%Y%m%d_%H%M%S')}.jsonl",
-                        )
-                        summary = run_single_shot(
-                            client_openai=client_openai,
-                            client_supabase=supabase,
-                            pdf_path=pdf_source_path,
-                            id_municipio=id_muni_sel,
-                            log_path=log_path,
-                            model=settings.openai_model,
-                            max_retries=settings.max_retries,
-                            retry_sleep_sec=settings.retry_sleep_sec,
-                            metas_staging_table=settings.metas_staging_table,
-                            doc_id=doc_id_ss,
-                        )
-
-                    st.success("Single-Shot finalizado.")
-                    st.json(summary)
-                    st.caption(f"Log: {log_path}")
+                with st.spinner("Ejecutando Single-Shot..."):
+                    log_path = os.path.join(
+                        "logs",
+                        f"single_shot_{time.strftime('%Y%m%d_%H%M%S')}.jsonl",
+                    )
+                    summary = run_single_shot(
+                        client_openai=client_openai,
+                        client_supabase=supabase,
+                        pdf_path=pdf_source_path,
+                        id_municipio=id_muni_sel,
+                        log_path=log_path,
+                        model=settings.openai_model,
+                        max_retries=settings.max_retries,
+                        retry_sleep_sec=settings.retry_sleep_sec,
+                        metas_staging_table=settings.metas_staging_table,
+                        doc_id=doc_id_ss,
+                    )
+
+                _invalidar_tabla("BD_DocumentosCargados")
+                st.success("Single-Shot finalizado.")
+                st.json(summary)
+                st.caption(f"Log: {log_path}")
 else:
     st.info("No hay documentos disponibles para ejecutar Single-Shot.")
 
@@ -855,7 +963,33 @@ st.markdown("---")
 st.subheader("Avance de carga del documento")
 
 
+@st.cache_resource
+def _rpcs_faltantes() -> set:
+    # Funciones de sql/app.sql que la base no tiene (no se reintentan)
+    return set()
+
+
+def _flags_carga(doc_id) -> Optional[dict]:
+    # {tabla: hay filas} del documento en un solo request (RPC de sql/app.sql);
+    # None si la función no está instalada o falla
+    if "tablas_con_datos_para_doc" in _rpcs_faltantes():
+        return None
+    try:
+        res = supabase.rpc("tablas_con_datos_para_doc", {"doc_id": doc_id}).execute()
+    except APIError as exc:
+        if getattr(exc, "code", None) == "PGRST202":
+            _rpcs_faltantes().add("tablas_con_datos_para_doc")
+        return None
+    return res.data if isinstance(res.data, dict) else None
+
+
+flags_carga = _flags_carga(doc_id_sel)
+
+
 def hay_registros(tabla: str) -> bool:
+    if flags_carga is not None:
+        return bool(flags_carga.get(tabla))
+
     # Tablas que tienen ID_DocumentoCargado directamente
     if tabla in [
         "bd_recursos",
@@ -960,6 +1094,24 @@ for nombre, ok in estado.items():
 # -------------------------------------------------
 # 5) PESTAÑAS PRINCIPALES
 # -------------------------------------------------
+# Todas las pestañas se renderizan en cada rerun: sus tablas con
+# ID_DocumentoCargado se consultan juntas, en paralelo
+def _filtro_doc(tabla: str, por_municipio: bool = False):
+    q = supabase.table(tabla).select("*").eq("ID_DocumentoCargado", doc_id_sel)
+    if por_municipio:
+        q = q.eq("ID_Municipio", id_muni_sel)
+    return q
+
+
+filas_doc = _select_paralelo({
+    "bd_recursos": _filtro_doc("bd_recursos", por_municipio=True),
+    "bd_gastos": _filtro_doc("bd_gastos"),
+    "bd_jurisdiccion": _filtro_doc("bd_jurisdiccion"),
+    "bd_situacionpatrimonial": _filtro_doc("bd_situacionpatrimonial", por_municipio=True),
+    "bd_movimientosTesoreria": _filtro_doc("bd_movimientosTesoreria", por_municipio=True),
+    "bd_cuentas": _filtro_doc("bd_cuentas", por_municipio=True),
+})
+
 tab_recursos, tab_gastos, tab_jurisdicciones, tab_programas, tab_sitpat, tab_tesoreria, tab_cuentas, tab_metas = st.tabs(
     [
         "Recursos",
@@ -977,14 +1129,7 @@ tab_recursos, tab_gastos, tab_jurisdicciones, tab_programas, tab_sitpat, tab_tes
 with tab_recursos:
     st.subheader("Recursos del documento")
 
-    res_r = (
-        supabase.table("bd_recursos")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .eq("ID_Municipio", id_muni_sel)  # filtro extra por municipio
-        .execute()
-    )
-    recursos = res_r.data if res_r.data else []
+    recursos = filas_doc["bd_recursos"]  # filtro extra por municipio
     df_rec = pd.DataFrame(recursos) if recursos else pd.DataFrame()
 
     if recursos:
@@ -1134,13 +1279,7 @@ with tab_recursos:
 with tab_gastos:
     st.subheader("Gastos del documento")
 
-    res_g = (
-        supabase.table("bd_gastos")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .execute()
-    )
-    gastos = res_g.data if res_g.data else []
+    gastos = filas_doc["bd_gastos"]
     df_g = pd.DataFrame(gastos) if gastos else pd.DataFrame()
 
     # -------------------------------------------------
@@ -1297,13 +1436,7 @@ with tab_gastos:
 with tab_jurisdicciones:
     st.subheader("Jurisdicciones del documento")
 
-    res_j = (
-        supabase.table("bd_jurisdiccion")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .execute()
-    )
-    jurisdicciones = res_j.data if res_j.data else []
+    jurisdicciones = filas_doc["bd_jurisdiccion"]
     df_j = pd.DataFrame(jurisdicciones) if jurisdicciones else pd.DataFrame()
 
     if jurisdicciones:
@@ -1376,13 +1509,7 @@ with tab_jurisdicciones:
 with tab_programas:
     st.subheader("Programas del documento")
 
-    res_j = (
-        supabase.table("bd_jurisdiccion")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .execute()
-    )
-    jurisdicciones = res_j.data if res_j.data else []
+    jurisdicciones = filas_doc["bd_jurisdiccion"]
     df_j = pd.DataFrame(jurisdicciones) if jurisdicciones else pd.DataFrame()
 
     if not jurisdicciones:
@@ -1517,14 +1644,7 @@ with tab_sitpat:
         st.error("No hay municipio seleccionado.")
         st.stop()
 
-    res_sp = (
-        supabase.table("bd_situacionpatrimonial")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .eq("ID_Municipio", id_muni_sel)
-        .execute()
-    )
-    sitpats = res_sp.data if res_sp.data else []
+    sitpats = filas_doc["bd_situacionpatrimonial"]
     df_sp = pd.DataFrame(sitpats) if sitpats else pd.DataFrame()
 
     if sitpats:
@@ -1658,14 +1778,7 @@ with tab_sitpat:
 with tab_tesoreria:
     st.subheader("Movimientos de tesorería")
 
-    res_mt = (
-        supabase.table("bd_movimientosTesoreria")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .eq("ID_Municipio", id_muni_sel)
-        .execute()
-    )
-    movs = res_mt.data if res_mt.data else []
+    movs = filas_doc["bd_movimientosTesoreria"]
     df_mt = pd.DataFrame(movs) if movs else pd.DataFrame()
 
     if movs:
@@ -1818,14 +1931,7 @@ with tab_tesoreria:
 with tab_cuentas:
     st.subheader("Cuentas")
 
-    res_c = (
-        supabase.table("bd_cuentas")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .eq("ID_Municipio", id_muni_sel)  # <-- para que sea "por municipio"
-        .execute()
-    )
-    cuentas = res_c.data if res_c.data else []
+    cuentas = filas_doc["bd_cuentas"]  # <-- "por municipio"
     df_c = pd.DataFrame(cuentas) if cuentas else pd.DataFrame()
 
     if cuentas:
@@ -1918,13 +2024,7 @@ with tab_cuentas:
 with tab_metas:
     st.subheader("Metas por programa")
 
-    res_j = (
-        supabase.table("bd_jurisdiccion")
-        .select("*")
-        .eq("ID_DocumentoCargado", doc_id_sel)
-        .execute()
-    )
-    jurisdicciones = res_j.data if res_j.data else []
+    jurisdicciones = filas_doc["bd_jurisdiccion"]
     df_j = pd.DataFrame(jurisdicciones) if jurisdicciones else pd.DataFrame()
 
     if not jurisdicciones:
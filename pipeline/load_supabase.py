@@ -4,7 +4,9 @@ Funciones de acceso a Supabase para el pipeline.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import functools
+import os
+from typing import Any, Dict, List, Optional
 
 from .utils import utc_now_iso
 
@@ -34,6 +36,47 @@ FIELD_ERROR = "Doc_Error"
 FIELD_STORAGE_PATH = "Doc_ArchivoStoragePath"
 FIELD_UPDATED = "Doc_ActualizadoUTC"
 
+# Pool HTTP compartido por todos los clientes de Supabase (app y agentes):
+# conexiones keep-alive que cubren los threads concurrentes, cuánto se
+# mantienen abiertas sin uso (s), y timeouts de conexión y de lectura (s).
+# La lectura queda en 120 s, el default de postgrest (upserts y exports grandes).
+HTTP_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 300
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_READ_TIMEOUT = 120.0
+
+
+@functools.lru_cache(maxsize=1)
+def shared_http_client() -> Optional[Any]:
+    """
+    httpx.Client de larga vida para pasar a create_client via
+    ClientOptions(httpx_client=...): reusa conexiones TLS entre requests
+    (HTTP/2 si está instalado h2). Devuelve None si la versión de supabase
+    no acepta un httpx_client propio.
+    """
+    try:
+        import httpx
+        from supabase import ClientOptions
+    except ImportError:
+        return None
+    if "httpx_client" not in getattr(ClientOptions, "__dataclass_fields__", {}):
+        return None
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(
+            max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
 
 def _get_storage_client(supabase):
     """
@@ -353,6 +396,56 @@ def download_pdf_from_storage(
     raise RuntimeError("No se pudieron obtener bytes del PDF descargado.")
 
 
+def download_pdf_stream(
+    supabase,
+    bucket: str,
+    storage_path: str,
+    dst_path: str,
+    chunk_size: int = 1 << 20,
+) -> int:
+    """
+    Descarga el PDF desde Storage directo a dst_path, en bloques de chunk_size
+    (sin tener el archivo entero en memoria). Devuelve los bytes escritos.
+    Si el streaming falla, usa download_pdf_from_storage.
+    """
+    if not bucket:
+        raise ValueError("bucket esta vacio.")
+    if not storage_path:
+        raise ValueError("storage_path esta vacio.")
+    if not dst_path:
+        raise ValueError("dst_path esta vacio.")
+
+    written = 0
+    try:
+        import httpx
+
+        # URL firmada absoluta (token en la query): no depende de clientes
+        # privados del SDK ni de sus headers de auth
+        storage = _get_storage_client(supabase)
+        signed = storage.from_(bucket).create_signed_url(storage_path, 60)
+        url = signed.get("signedURL") or signed.get("signedUrl")
+        if not url:
+            raise RuntimeError(f"Storage no devolvió una URL firmada: {signed}")
+
+        timeout = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        with httpx.stream("GET", url, timeout=timeout) as res:
+            res.raise_for_status()
+            with open(dst_path, "wb") as handle:
+                for block in res.iter_bytes(chunk_size=chunk_size):
+                    handle.write(block)
+                    written += len(block)
+    except Exception:
+        # No dejar un PDF a medio escribir; reintentar con la descarga completa
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        pdf_bytes = download_pdf_from_storage(supabase, bucket, storage_path)
+        with open(dst_path, "wb") as handle:
+            handle.write(pdf_bytes)
+        return len(pdf_bytes)
+
+    return written
+
+
 def delete_pdf_from_storage(supabase, bucket: str, storage_path: str) -> None:
     """
     Borra un PDF desde Storage.
@@ -0,0 +1,47 @@
+-- Funciones RPC que usa la app de Streamlit (app.py).
+--
+-- Correr una vez en el SQL editor de Supabase. Son opcionales: si una función
+-- no existe, la app cae al camino anterior (una consulta por tabla).
+
+-- Qué tablas tienen filas para el documento: {tabla: bool} en un solo
+-- round-trip, para el "Avance de carga". Programas y metas cuelgan del
+-- documento a través de sus jurisdicciones.
+create or replace function public.tablas_con_datos_para_doc(doc_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'bd_recursos', exists (
+            select 1 from public."bd_recursos" where "ID_DocumentoCargado" = doc_id
+        ),
+        'bd_gastos', exists (
+            select 1 from public."bd_gastos" where "ID_DocumentoCargado" = doc_id
+        ),
+        'bd_jurisdiccion', exists (
+            select 1 from public."bd_jurisdiccion" where "ID_DocumentoCargado" = doc_id
+        ),
+        'bd_situacionpatrimonial', exists (
+            select 1 from public."bd_situacionpatrimonial" where "ID_DocumentoCargado" = doc_id
+        ),
+        'bd_movimientosTesoreria', exists (
+            select 1 from public."bd_movimientosTesoreria" where "ID_DocumentoCargado" = doc_id
+        ),
+        'bd_cuentas', exists (
+            select 1 from public."bd_cuentas" where "ID_DocumentoCargado" = doc_id
+        ),
+        'bd_programas', exists (
+            select 1
+              from public."bd_programas" p
+              join public."bd_jurisdiccion" j on j."ID_Jurisdiccion" = p."ID_Jurisdiccion"
+             where j."ID_DocumentoCargado" = doc_id
+        ),
+        'bd_metas', exists (
+            select 1
+              from public."bd_metas" m
+              join public."bd_programas" p on p."ID_Programa" = m."ID_Programa"
+              join public."bd_jurisdiccion" j on j."ID_Jurisdiccion" = p."ID_Jurisdiccion"
+             where j."ID_DocumentoCargado" = doc_id
+        )
+    );
+$$;
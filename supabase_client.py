@@ -1,6 +1,9 @@
 import streamlit as st
 from supabase import create_client, Client
 
+from pipeline.load_supabase import shared_http_client
+
+
 @st.cache_resource
 def get_supabase_client() -> Client:
     """
@@ -9,5 +12,10 @@ def get_supabase_client() -> Client:
     """
     url = st.secrets["supabase"]["url"]
     key = st.secrets["supabase"]["key"]
-    supabase: Client = create_client(url, key)
+    http_client = shared_http_client()
+    if http_client is None:
+        supabase: Client = create_client(url, key)
+    else:
+        from supabase import ClientOptions
+        supabase = create_client(url, key, options=ClientOptions(httpx_client=http_client))
     return supabase